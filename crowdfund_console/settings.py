@@ -29,7 +29,11 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'projects.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'projects.staticfiles.StaticFilesMiddleware',
+    'projects.routers.ReadYourWritesMiddleware',
+    'projects.conditional.PrivateCookiesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -42,7 +46,9 @@ ROOT_URLCONF = 'crowdfund_console.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus per-template render timing (projects/templating.py)
+        'BACKEND': 'projects.templating.InstrumentedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  # Add this line
         'APP_DIRS': True,
         'OPTIONS': {
@@ -56,14 +62,89 @@ TEMPLATES = [
     },
 ]
 
+# "production" pins the cached loader and drops template debug info and the
+# debug context processor even when DJANGO_DEBUG is left at its default.
+CROWDFUND_TEMPLATE_PROFILE = os.getenv('CROWDFUND_TEMPLATE_PROFILE', 'development' if DEBUG else 'production')
+if CROWDFUND_TEMPLATE_PROFILE == 'production':
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['debug'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove('django.template.context_processors.debug')
+# compile every template under templates/ when the WSGI/ASGI app starts
+CROWDFUND_WARM_TEMPLATES = os.getenv(
+    'CROWDFUND_WARM_TEMPLATES', str(CROWDFUND_TEMPLATE_PROFILE == 'production')) == 'True'
+CROWDFUND_SLOW_RENDER_MS = float(os.getenv('CROWDFUND_SLOW_RENDER_MS', 200))
+
 WSGI_APPLICATION = 'crowdfund_console.wsgi.application'
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('DJANGO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+# 'production' turns on the tuned SQLite profile: persistent connections,
+# BEGIN IMMEDIATE for write transactions (so writers queue on busy_timeout
+# instead of failing on lock upgrade), and the PRAGMAs below applied by
+# projects.db.tune_sqlite_connection.
+CROWDFUND_SQLITE_PROFILE = os.getenv('CROWDFUND_SQLITE_PROFILE', 'default')
+CROWDFUND_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,               # ms
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,           # KiB
+    'temp_store': 'MEMORY',
+}
+if CROWDFUND_SQLITE_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.getenv('DJANGO_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 5},
+    })
+
+# Read replicas (projects/routers.py). DJANGO_REPLICA_DB_NAMES is a comma list
+# of SQLite files, each optionally suffixed with @weight, e.g.
+# "/srv/replica-a.sqlite3@2,/srv/replica-b.sqlite3"; other engines can add
+# aliases to DATABASES and CROWDFUND_DB_REPLICAS directly. Leave it unset for
+# the test suite: test cases only declare the default database.
+CROWDFUND_DB_REPLICAS = {}
+for i, spec in enumerate(filter(None, os.getenv('DJANGO_REPLICA_DB_NAMES', '').split(',')), 1):
+    replica_name, _, replica_weight = spec.partition('@')
+    DATABASES[f'replica{i}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': replica_name,
+        'TEST': {'MIRROR': 'default'},
     }
+    CROWDFUND_DB_REPLICAS[f'replica{i}'] = int(replica_weight or 1)
+DATABASE_ROUTERS = ['projects.routers.PrimaryReplicaRouter']
+CROWDFUND_DB_STICKY_SECONDS = int(os.getenv('CROWDFUND_DB_STICKY_SECONDS', 15))
+
+# Request metrics (projects/metrics.py), served at /metrics to these addresses
+CROWDFUND_METRICS_IPS = os.getenv('CROWDFUND_METRICS_IPS', '127.0.0.1,::1').split(',')
+# queries allowed per URL name; "log" a warning or "raise" QueryBudgetExceeded
+CROWDFUND_QUERY_BUDGETS = {
+    'project_list': 6,
+    'project_detail': 4,
+    'project_donations': 4,
+    'project_donations_export': 5,
+    'project_analytics': 5,
+    'project_donate': 10,
+    'my_projects': 5,
+    'login': 10,
+    'register': 6,
 }
+CROWDFUND_QUERY_BUDGET_ACTION = os.getenv('CROWDFUND_QUERY_BUDGET_ACTION', 'log')
+
+# write paths wrapped in projects.db.retry_on_busy
+CROWDFUND_DB_BUSY_RETRIES = int(os.getenv('CROWDFUND_DB_BUSY_RETRIES', 5))
+CROWDFUND_DB_BUSY_DELAY = float(os.getenv('CROWDFUND_DB_BUSY_DELAY', 0.05))  # seconds, grows per attempt
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -83,6 +164,44 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Rendered fragments of project_detail.html (see projects/cache.py).
+# CROWDFUND_FRAGMENT_CACHE selects locmem (default), file or redis; redis
+# needs the optional `redis` package and a server at CROWDFUND_REDIS_URL.
+# Locally any RESP server will do, e.g. `redis-server --port 6379` or
+# `docker run -p 6379:6379 redis`; projects/tests.py runs the fragments
+# against RedisStandIn, an in-process stand-in, when `redis` is installed.
+FRAGMENT_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'crowdfund-fragments',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CROWDFUND_FRAGMENT_CACHE_DIR', str(BASE_DIR / '.cache' / 'fragments')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CROWDFUND_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': FRAGMENT_CACHE_BACKENDS[os.getenv('CROWDFUND_FRAGMENT_CACHE', 'locmem')],
+}
+
+CROWDFUND_FRAGMENT_TTL = int(os.getenv('CROWDFUND_FRAGMENT_TTL', 600))  # seconds; writes invalidate earlier
+# Lifetime of the project list version behind its ETag (projects/cache.py).
+# Writes bump it in the fragment cache; with a per-process cache (locmem)
+# bumps from other workers and management commands only show once it expires.
+CROWDFUND_LIST_VERSION_TTL = int(os.getenv('CROWDFUND_LIST_VERSION_TTL', 30))
+# Cache-Control max-age for anonymous project pages (projects/conditional.py);
+# signed-in visitors always revalidate against the ETag instead
+CROWDFUND_ANON_CACHE_SECONDS = int(os.getenv('CROWDFUND_ANON_CACHE_SECONDS', 60))
+
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Africa/Cairo'
 USE_I18N = True
@@ -91,6 +210,26 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = os.getenv('DJANGO_STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+# "production" needs `manage.py collectstatic`: hashed file names from
+# staticfiles.json, with .gz/.br copies written next to them
+# (projects/staticfiles.py; .br only when the brotli package is installed)
+CROWDFUND_STATIC_PROFILE = os.getenv('CROWDFUND_STATIC_PROFILE', 'development' if DEBUG else 'production')
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'projects.staticfiles.CompressedManifestStaticFilesStorage'
+        if CROWDFUND_STATIC_PROFILE == 'production'
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+# Serve STATIC_ROOT from the app (projects.staticfiles.StaticFilesMiddleware)
+# for deployments without a proxy in front; hashed files are cached for a
+# year as immutable, anything else for CROWDFUND_STATIC_MAX_AGE seconds
+CROWDFUND_SERVE_STATIC = os.getenv(
+    'CROWDFUND_SERVE_STATIC', str(CROWDFUND_STATIC_PROFILE == 'production')) == 'True'
+CROWDFUND_STATIC_MAX_AGE = int(os.getenv('CROWDFUND_STATIC_MAX_AGE', 300))
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -98,13 +237,65 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = "projects.User"
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+EMAIL_BACKEND = os.getenv('DJANGO_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.getenv('DJANGO_EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('DJANGO_EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.getenv('DJANGO_EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('DJANGO_EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('DJANGO_EMAIL_USE_TLS', 'False') == 'True'
+EMAIL_TIMEOUT = int(os.getenv('DJANGO_EMAIL_TIMEOUT', 10))
+DEFAULT_FROM_EMAIL = os.getenv('DJANGO_DEFAULT_FROM_EMAIL', 'Crowdfund Console <no-reply@localhost>')
+
+# Outbound mail goes through the outbox table (projects/mail.py) and is sent
+# by `manage.py send_outbox`; failures back off from RETRY_BASE seconds,
+# doubling up to RETRY_MAX, and give up after MAX_ATTEMPTS
+CROWDFUND_MAIL_BATCH_SIZE = int(os.getenv('CROWDFUND_MAIL_BATCH_SIZE', 100))
+CROWDFUND_MAIL_MAX_ATTEMPTS = int(os.getenv('CROWDFUND_MAIL_MAX_ATTEMPTS', 8))
+CROWDFUND_MAIL_RETRY_BASE = float(os.getenv('CROWDFUND_MAIL_RETRY_BASE', 30))
+CROWDFUND_MAIL_RETRY_MAX = float(os.getenv('CROWDFUND_MAIL_RETRY_MAX', 3600))
+CROWDFUND_MAIL_LEASE_SECONDS = int(os.getenv('CROWDFUND_MAIL_LEASE_SECONDS', 300))
 
 CROWDFUND_TARGET_MAX = int(os.getenv('CROWDFUND_TARGET_MAX', 10000000))  # 10 million EGP default
+# Keyset pagination on the project list (no COUNT(*), constant cost per page)
+CROWDFUND_CURSOR_PAGINATION = os.getenv('CROWDFUND_CURSOR_PAGINATION', 'False') == 'True'
+# Serve the list/detail/donation read views from projects.async_views (ASGI deployments)
+CROWDFUND_ASYNC_VIEWS = os.getenv('CROWDFUND_ASYNC_VIEWS', 'False') == 'True'
+# Accept donations into an append-only journal and apply them with
+# `manage.py drain_donations` (projects/journal.py)
+CROWDFUND_DONATION_WRITE_BEHIND = os.getenv('CROWDFUND_DONATION_WRITE_BEHIND', 'False') == 'True'
+CROWDFUND_DONATION_JOURNAL = os.getenv('CROWDFUND_DONATION_JOURNAL', str(BASE_DIR / 'var' / 'donations.journal'))
+CROWDFUND_DONATION_JOURNAL_FSYNC = os.getenv('CROWDFUND_DONATION_JOURNAL_FSYNC', 'True') == 'True'
 
 SITE_ID = 1
 
+# Login hardening (projects/auth.py): bounded password hashing and per-IP /
+# per-email token buckets ("attempts/seconds"). Set the throttle cache to a
+# CACHES alias to share buckets between workers.
+CROWDFUND_HASH_WORKERS = int(os.getenv('CROWDFUND_HASH_WORKERS', os.cpu_count() or 2))
+CROWDFUND_HASH_QUEUE = int(os.getenv('CROWDFUND_HASH_QUEUE', 32))
+CROWDFUND_LOGIN_IP_RATE = os.getenv('CROWDFUND_LOGIN_IP_RATE', '30/60')
+CROWDFUND_LOGIN_EMAIL_RATE = os.getenv('CROWDFUND_LOGIN_EMAIL_RATE', '10/300')
+CROWDFUND_LOGIN_THROTTLE_CACHE = os.getenv('CROWDFUND_LOGIN_THROTTLE_CACHE') or None
+
+# Per-process cache of the request user (projects.backends.EmailBackend.get_user);
+# 0 disables it. Saving a user drops its entry in the saving process at once.
+CROWDFUND_USER_CACHE_TTL = int(os.getenv('CROWDFUND_USER_CACHE_TTL', 30))
+CROWDFUND_USER_CACHE_SIZE = int(os.getenv('CROWDFUND_USER_CACHE_SIZE', 10000))
+
+# 'cached_db' or 'signed_cookies' skip the session query on reads. Only use
+# cached_db with a cache shared by all workers (CROWDFUND_SESSION_CACHE naming
+# a redis-backed alias); with per-process locmem a logout would not reach the
+# other workers' copies.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.getenv('CROWDFUND_SESSION_ENGINE', 'db')
+SESSION_CACHE_ALIAS = os.getenv('CROWDFUND_SESSION_CACHE', 'default')
+
+# EmailBackend subclasses ModelBackend, so permissions still work. ModelBackend
+# itself is not listed: after a failed login it would hash the password a
+# second time, on the request thread instead of the bounded executor.
 AUTHENTICATION_BACKENDS = [
     "projects.backends.EmailBackend",
-    "django.contrib.auth.backends.ModelBackend",
 ]
+
+# Admin change lists (projects/admin.py): unfiltered lists show the planner's
+# row estimate once a table is this big; filtered lists count up to this many
+CROWDFUND_ADMIN_COUNT_LIMIT = int(os.getenv('CROWDFUND_ADMIN_COUNT_LIMIT', 10000))
@@ -1,12 +1,20 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from projects import views as project_views
+from projects import async_views, views as project_views
+
+if settings.CROWDFUND_ASYNC_VIEWS:
+    project_list_view = async_views.project_list
+else:
+    project_list_view = project_views.ProjectListView.as_view()
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("", project_views.ProjectListView.as_view(), name="project_list"),
+    path("", project_list_view, name="project_list"),
     path("register/", project_views.register, name="register"),
+    path("activate/<uidb64>/<token>/", project_views.activate, name="activate"),
     path("login/", project_views.login_view, name="login"),
     path("logout/", project_views.logout_view, name="logout"),
+    path("metrics", project_views.metrics, name="metrics"),
     path("projects/", include("projects.urls")),  # <-- this includes all projects/* paths
 ]
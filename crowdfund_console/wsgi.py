@@ -3,4 +3,19 @@ from django.core.wsgi import get_wsgi_application
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crowdfund_console.settings')
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.CROWDFUND_WARM_TEMPLATES:
+    from projects.templating import warm_templates
+
+    warm_templates()
+
+from projects.auth import warm_password_validators  # noqa: E402
+
+warm_password_validators()
+
+from projects.checks import warn_unshared_caches  # noqa: E402
+
+warn_unshared_caches()
@@ -0,0 +1,94 @@
+"""Native async versions of the read-only project views.
+
+Enabled with CROWDFUND_ASYNC_VIEWS under an ASGI server. Everything the
+templates need is loaded with the async ORM before rendering, so the render
+itself never touches the database from the event loop.
+"""
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
+from django.shortcuts import render
+
+from .conditional import conditional_page, project_detail_validators, project_list_validators
+from .forms import DonationForm
+from .models import Project
+from .pagination import CursorPaginator, InvalidCursor
+from .views import (
+    DONATIONS_PER_PAGE, ProjectListView, filter_projects, project_detail_context, use_cursor_pagination,
+)
+
+
+async def _load_user(request):
+    # Resolve the lazy request.user (and with it the session) up front; the
+    # auth and messages context processors read both synchronously.
+    request.user = await request.auser()
+
+
+async def _get_project(pk):
+    try:
+        return await Project.objects.aget(pk=pk)
+    except Project.DoesNotExist:
+        raise Http404("No project found matching the query")
+
+
+@conditional_page(project_list_validators)
+async def project_list(request):
+    await _load_user(request)
+    params = request.GET
+    qs = filter_projects(Project.objects.all(), params)
+    per_page = ProjectListView.paginate_by
+
+    if use_cursor_pagination(params):
+        paginator = CursorPaginator(qs, per_page)
+        try:
+            page = await paginator.apage(params.get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid cursor.")
+        is_paginated = page.has_other_pages()
+    else:
+        paginator = Paginator(qs, per_page)
+        paginator.count = await qs.acount()
+        try:
+            page = paginator.page(params.get("page") or 1)
+        except InvalidPage:
+            raise Http404("Invalid page.")
+        page.object_list = [project async for project in page.object_list]
+        is_paginated = page.has_other_pages()
+
+    return render(request, ProjectListView.template_name, {
+        "paginator": paginator,
+        "page_obj": page,
+        "is_paginated": is_paginated,
+        "object_list": page.object_list,
+        "projects": page.object_list,
+        "q": params.get("q", ""),
+        "date": params.get("date", ""),
+        "order": params.get("order", ""),
+        "cursor_mode": use_cursor_pagination(params),
+    })
+
+
+@conditional_page(project_detail_validators)
+async def project_detail(request, pk):
+    await _load_user(request)
+    project = getattr(request, "validated_project", None) or await _get_project(pk)
+    ctx = project_detail_context(project, DonationForm())
+    # the fragment cache cannot be consulted lazily from here, so the ten
+    # recent donations are always fetched (one LIMIT 10 index scan)
+    ctx["donations"] = [d async for d in ctx["donations"]]
+    ctx["object"] = project
+    return render(request, "projects/project_detail.html", ctx)
+
+
+async def project_donations(request, pk):
+    await _load_user(request)
+    project = await _get_project(pk)
+    paginator = CursorPaginator(project.donations.select_related("donor"), DONATIONS_PER_PAGE)
+    try:
+        page = await paginator.apage(request.GET.get("cursor"))
+    except InvalidCursor:
+        raise Http404("Invalid cursor.")
+    return render(request, "projects/donation_list.html", {
+        "project": project,
+        "donations": page.object_list,
+        "page_obj": page,
+    })
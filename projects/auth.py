@@ -0,0 +1,177 @@
+"""Password checks for login_view and EmailBackend that hold up under login storms.
+
+* Hashing runs on a small bounded executor, so at most
+  CROWDFUND_HASH_WORKERS PBKDF2 computations compete with page rendering;
+  when the queue is full, callers fail fast with HashingBusy.
+* Attempts are rate limited per client IP and per email with token buckets,
+  kept in process or in a shared cache (CROWDFUND_LOGIN_THROTTLE_CACHE).
+* Unknown emails pay for the same hash as known ones, so response time does
+  not reveal which addresses have accounts.
+
+Registration hashes new passwords on the same executor
+(RegistrationForm.set_password_and_save).
+"""
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import password_validation
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .models import User
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class BoundedHasher:
+    def __init__(self, workers, max_pending, wait=1.0):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hash")
+        self.slots = threading.BoundedSemaphore(workers + max_pending)
+        self.wait = wait
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(timeout=self.wait):
+            raise HashingBusy
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+
+class TokenBucket:
+    """In-process token buckets: `capacity` attempts, refilled over `period` seconds."""
+
+    max_keys = 100_000
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self._prune(now)
+            return allowed
+
+    def _prune(self, now):
+        # buckets that have refilled completely carry no state worth keeping
+        full = self.capacity / self.rate
+        self.buckets = {k: v for k, v in self.buckets.items() if now - v[1] < full}
+
+
+class CacheTokenBucket(TokenBucket):
+    """Token buckets stored in a Django cache, shared by every worker.
+
+    The read-modify-write is not atomic across processes; under contention a
+    few extra attempts may slip through, which is acceptable for throttling.
+    """
+
+    def __init__(self, capacity, period, alias, prefix):
+        super().__init__(capacity, period)
+        self.cache = caches[alias]
+        self.prefix = prefix
+        self.period = period
+
+    def consume(self, key, now=None):
+        now = time.time() if now is None else now
+        cache_key = f"{self.prefix}:{key}"
+        tokens, updated = self.cache.get(cache_key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        self.cache.set(cache_key, (tokens - 1 if allowed else tokens, now), self.period)
+        return allowed
+
+
+def parse_rate(rate):
+    attempts, period = rate.split("/")
+    return int(attempts), float(period)
+
+
+def _bucket(rate, name):
+    capacity, period = parse_rate(rate)
+    alias = settings.CROWDFUND_LOGIN_THROTTLE_CACHE
+    if alias:
+        return CacheTokenBucket(capacity, period, alias, f"login-throttle:{name}")
+    return TokenBucket(capacity, period)
+
+
+@functools.cache
+def hasher():
+    return BoundedHasher(settings.CROWDFUND_HASH_WORKERS, settings.CROWDFUND_HASH_QUEUE)
+
+
+@functools.cache
+def throttles():
+    return (
+        _bucket(settings.CROWDFUND_LOGIN_IP_RATE, "ip"),
+        _bucket(settings.CROWDFUND_LOGIN_EMAIL_RATE, "email"),
+    )
+
+
+@functools.cache
+def dummy_hash():
+    return make_password("constant-work-for-unknown-users")
+
+
+def warm_password_validators():
+    """Build AUTH_PASSWORD_VALIDATORS now rather than on the first signup.
+
+    CommonPasswordValidator reads and unpacks its list of 20,000 passwords
+    into a set when it is built, about 30ms. wsgi.py and asgi.py call this at
+    startup, and Django keeps the instances for the life of the process.
+    """
+    return password_validation.get_default_password_validators()
+
+
+@receiver(setting_changed)
+def reset_login_state(setting, **kwargs):
+    if setting.startswith("CROWDFUND_HASH_"):
+        hasher.cache_clear()
+    if setting.startswith("CROWDFUND_LOGIN_"):
+        throttles.cache_clear()
+
+
+def login_allowed(request, email):
+    ip_bucket, email_bucket = throttles()
+    ip = request.META.get("REMOTE_ADDR", "") if request is not None else ""
+    # consume from both so a blocked IP cannot keep probing one address
+    ip_ok = ip_bucket.consume(ip)
+    email_ok = email_bucket.consume(email.lower())
+    return ip_ok and email_ok
+
+
+def verify_credentials(email, password):
+    """Return the user whose email and password match, else None.
+
+    Costs one hash whether or not the email exists. Raises HashingBusy when
+    the hashing executor is saturated.
+    """
+    try:
+        user = User.objects.get_by_email(email)
+    except User.DoesNotExist:
+        hasher().run(check_password, password, dummy_hash())
+        return None
+
+    outdated = []
+    valid = hasher().run(check_password, password, user.password, outdated.append)
+    if not valid:
+        return None
+    if outdated:
+        # hasher upgrade: save from the request thread, not the executor's
+        user.set_password(password)
+        user.save(update_fields=["password"])
+    return user
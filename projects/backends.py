@@ -1,19 +1,82 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
-from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+
+from .auth import HashingBusy, login_allowed, verify_credentials
+
+
+class UserCache:
+    """Short-lived per-process cache of users loaded for authenticated requests.
+
+    Entries are dropped when the user is saved or deleted in this process
+    (see projects.signals); other processes see the change within the TTL.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, pk):
+        entry = self.entries.get(pk)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        # a copy, so per-request changes never leak into the shared instance
+        return copy.copy(entry[0])
+
+    def set(self, user, ttl):
+        with self.lock:
+            if len(self.entries) >= settings.CROWDFUND_USER_CACHE_SIZE:
+                now = time.monotonic()
+                self.entries = {k: v for k, v in self.entries.items() if v[1] >= now}
+                if len(self.entries) >= settings.CROWDFUND_USER_CACHE_SIZE:
+                    self.entries.clear()
+            self.entries[user.pk] = (copy.copy(user), time.monotonic() + ttl)
+
+    def invalidate(self, pk):
+        with self.lock:
+            self.entries.pop(pk, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache()
 
-User = get_user_model()
 
 class EmailBackend(ModelBackend):
-   
+
     def authenticate(self, request, username=None, password=None, **kwargs):
         email = username or kwargs.get("email")
         if not email or not password:
             return None
+        # PermissionDenied stops authenticate() from trying the next backend
+        if not login_allowed(request, email):
+            raise PermissionDenied
         try:
-            user = User.objects.get(email__iexact=email)
-        except User.DoesNotExist:
-            return None
+            user = verify_credentials(email, password)
+        except HashingBusy:
+            raise PermissionDenied
 
-        if user.check_password(password) and self.user_can_authenticate(user):
+        if user is not None and self.user_can_authenticate(user):
             return user
         return None
+
+    def get_user(self, user_id):
+        ttl = settings.CROWDFUND_USER_CACHE_TTL
+        if not ttl:
+            return super().get_user(user_id)
+        try:
+            pk = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        user = user_cache.get(pk)
+        if user is None:
+            user = super().get_user(pk)
+            if user is not None:
+                user_cache.set(user, ttl)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,218 @@
+"""Timed scenarios over the crowdfunding hot paths (see `manage.py benchmark`).
+
+Scenarios run either in-process through Django's test client, where the
+queries issued per request are counted too, or against a running server
+through a small threaded HTTP driver. Only 2xx/3xx answers are timed; any
+other status is counted under "failed".
+"""
+import http.cookiejar
+import itertools
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from .management.commands.seed_data import BENCH_PASSWORD
+from .models import User, Project
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Fixtures:
+    """Ids and credentials the scenarios need, read once from the seeded data."""
+
+    def __init__(self):
+        projects = Project.objects.filter(is_active=True)
+        self.hot_project = projects.order_by("-donation_count").values_list("pk", flat=True).first()
+        self.recent_project = projects.order_by("-created_at").values_list("pk", flat=True).first()
+        # one address per login keeps the per-email throttle out of the numbers
+        self.login_emails = list(User.objects.filter(email__startswith="bench-user-").order_by("pk").values_list(
+            "email", flat=True))
+        self.today = timezone.localdate().isoformat()
+
+
+SCENARIOS = ("list", "search", "date_filter", "detail", "donate", "login", "register")
+
+
+def scenarios(fx):
+    """name -> (method, path, data factory or None)."""
+    login_emails = itertools.cycle(fx.login_emails)
+    return {
+        "list": ("GET", "/", None),
+        "search": ("GET", "/?q=water+school", None),
+        "date_filter": ("GET", f"/?date={fx.today}", None),
+        "detail": ("GET", f"/projects/{fx.hot_project}/", None),
+        "donate": ("POST", f"/projects/{fx.recent_project}/donate/",
+                   lambda: {"donor_name": "Bench", "amount": 10}),
+        "login": ("POST", "/login/",
+                  lambda: {"email": next(login_emails), "password": BENCH_PASSWORD}),
+        "register": ("POST", "/register/", lambda: {
+            "first_name": "Bench", "last_name": "User",
+            "email": f"bench-signup-{uuid.uuid4().hex}@example.com", "mobile_phone": "01012345678",
+            "password1": BENCH_PASSWORD, "password2": BENCH_PASSWORD,
+        }),
+    }
+
+
+def succeeded(status):
+    return 200 <= status < 400
+
+
+def summarize(latencies, elapsed, queries=None, failed=0):
+    ms = [t * 1000 for t in latencies]
+    result = {
+        "requests": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "rps": round(len(ms) / elapsed, 1) if elapsed else 0.0,
+    }
+    if failed:
+        # rate limited (429), shed under load (503) or broken; not in the timings
+        result["failed"] = failed
+    if queries is not None:
+        result["queries_per_request"] = round(statistics.mean(queries), 2) if queries else 0
+    return result
+
+
+class InProcessDriver:
+    """Django test client; with concurrency > 1 each thread gets its own client and DB connection."""
+
+    # every request comes from one client IP, which the login throttle would
+    # answer with 429 after a few dozen attempts
+    UNTHROTTLED = {"CROWDFUND_LOGIN_IP_RATE": "1000000/1", "CROWDFUND_LOGIN_EMAIL_RATE": "1000000/1"}
+
+    def __init__(self, concurrency=1):
+        self.concurrency = concurrency
+        # outside the test runner "testserver" is not an allowed host
+        host = settings.ALLOWED_HOSTS[0].lstrip(".") if settings.ALLOWED_HOSTS else "localhost"
+        self.host = "localhost" if host == "*" else host
+
+    def run(self, method, path, data_factory, iterations, warmup):
+        self.local = threading.local()  # fresh cookies per scenario
+        with override_settings(**self.UNTHROTTLED):
+            for _ in range(warmup):
+                self._timed(method, path, data_factory)
+            started = time.perf_counter()
+            if self.concurrency == 1:
+                samples = [self._timed(method, path, data_factory) for _ in range(iterations)]
+            else:
+                with ThreadPoolExecutor(self.concurrency) as pool:
+                    samples = list(pool.map(lambda _: self._timed(method, path, data_factory), range(iterations)))
+            elapsed = time.perf_counter() - started
+        ok = [(latency, queries) for latency, queries, status in samples if succeeded(status)]
+        latencies, queries = zip(*ok) if ok else ((), ())
+        return summarize(latencies, elapsed, queries, len(samples) - len(ok))
+
+    def _timed(self, method, path, data_factory):
+        if not hasattr(self.local, "client"):
+            self.local.client = Client(HTTP_HOST=self.host)
+        client = self.local.client
+        with CaptureQueriesContext(connection) as captured:
+            t0 = time.perf_counter()
+            if method == "GET":
+                response = client.get(path)
+            else:
+                response = client.post(path, data_factory())
+            elapsed = time.perf_counter() - t0
+        return elapsed, len(captured), response.status_code
+
+
+class HttpDriver:
+    """Threaded urllib driver for a running server; one cookie jar per thread."""
+
+    def __init__(self, base_url, concurrency=10):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.local = threading.local()
+
+    def _opener(self):
+        if not hasattr(self.local, "opener"):
+            self.local.jar = http.cookiejar.CookieJar()
+            self.local.opener = urllib.request.build_opener(
+                urllib.request.HTTPCookieProcessor(self.local.jar), _NoRedirect)
+            self.local.opener.open(self.base_url + "/login/").read()  # sets csrftoken
+        return self.local.opener
+
+    def _request(self, method, path, data_factory):
+        opener = self._opener()
+        url = self.base_url + path
+        if method == "GET":
+            request = urllib.request.Request(url)
+        else:
+            token = next((c.value for c in self.local.jar if c.name == "csrftoken"), "")
+            body = urllib.parse.urlencode(data_factory()).encode()
+            request = urllib.request.Request(url, data=body, headers={"X-CSRFToken": token, "Referer": url})
+        t0 = time.perf_counter()
+        try:
+            with opener.open(request) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code  # redirects land here too, as _NoRedirect does not follow them
+        return time.perf_counter() - t0, status
+
+    def run(self, method, path, data_factory, iterations, warmup):
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            list(pool.map(lambda _: self._request(method, path, data_factory), range(warmup)))
+            started = time.perf_counter()
+            samples = list(pool.map(lambda _: self._request(method, path, data_factory), range(iterations)))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for latency, status in samples if succeeded(status)]
+        return summarize(latencies, elapsed, failed=len(samples) - len(latencies))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def run_benchmarks(driver, names=None, iterations=100, warmup=5):
+    fx = Fixtures()
+    results = {}
+    for name, (method, path, data_factory) in scenarios(fx).items():
+        if names and name not in names:
+            continue
+        results[name] = driver.run(method, path, data_factory, iterations, warmup)
+    return results
+
+
+def compare(baseline, current, threshold=0.2):
+    """Return human-readable regressions of `current` against `baseline`.
+
+    A scenario regresses when its p95 grows by more than `threshold`
+    (a fraction), when it issues more queries per request than before or
+    when more of its requests fail.
+    """
+    regressions = []
+    for name, base in baseline.items():
+        now = current.get(name)
+        if now is None:
+            continue
+        if now["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {now['p95_ms']}ms")
+        if "queries_per_request" in base and now.get("queries_per_request", 0) > base["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries/request {base['queries_per_request']} -> {now['queries_per_request']}"
+            )
+        if now.get("failed", 0) > base.get("failed", 0):
+            regressions.append(f"{name}: failed requests {base.get('failed', 0)} -> {now['failed']}")
+    return regressions
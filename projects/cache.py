@@ -0,0 +1,52 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.utils import timezone
+
+# Cache alias and {% cache %} fragment names used by project_detail.html.
+FRAGMENT_CACHE = "fragments"
+DETAILS_FRAGMENT = "project_details"
+DONATIONS_FRAGMENT = "project_donations"
+
+# Validators of the project list (projects/conditional.py). It lives in the
+# fragment cache so that every worker sharing that cache sees each bump; it
+# expires after CROWDFUND_LIST_VERSION_TTL in case a bump never reaches this
+# process (a per-process cache; see projects.checks).
+LIST_VERSION_KEY = "project_list_version"
+
+
+def invalidate_project_fragments(pk, details=True):
+    keys = [make_template_fragment_key(DONATIONS_FRAGMENT, [pk])]
+    if details:
+        keys.append(make_template_fragment_key(DETAILS_FRAGMENT, [pk]))
+    caches[FRAGMENT_CACHE].delete_many(keys)
+
+
+def _new_list_version():
+    return uuid.uuid4().hex, timezone.now()
+
+
+def list_version():
+    """(token, changed at) of the project list; starts a new one when evicted."""
+    cache = caches[FRAGMENT_CACHE]
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        version = _new_list_version()
+        if not cache.add(LIST_VERSION_KEY, version, settings.CROWDFUND_LIST_VERSION_TTL):
+            version = cache.get(LIST_VERSION_KEY, version)
+    return version
+
+
+def bump_list_version():
+    caches[FRAGMENT_CACHE].set(LIST_VERSION_KEY, _new_list_version(), settings.CROWDFUND_LIST_VERSION_TTL)
+
+
+def project_list_changed(using="default"):
+    """Call on any write that changes what the project list shows."""
+    # now and again after commit, so a request that read the old rows in
+    # between does not keep the new version
+    bump_list_version()
+    transaction.on_commit(bump_list_version, using=using)
@@ -0,0 +1,37 @@
+import logging
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from .cache import FRAGMENT_CACHE
+
+logger = logging.getLogger(__name__)
+
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_fragment_cache_is_shared(app_configs=None, **kwargs):
+    if settings.CACHES[FRAGMENT_CACHE]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"The '{FRAGMENT_CACHE}' cache is local to each process.",
+        hint=(
+            "Other workers and management commands (refresh_trending, drain_donations, "
+            "import_donations, reconcile_totals) cannot invalidate this process's fragments or "
+            "project list ETag; they show once CROWDFUND_FRAGMENT_TTL / CROWDFUND_LIST_VERSION_TTL "
+            "run out. Set CROWDFUND_FRAGMENT_CACHE to file or redis."
+        ),
+        id="projects.W001",
+    )]
+
+
+def warn_unshared_caches():
+    """Log the check above when a production server starts; gunicorn runs no system checks."""
+    if settings.DEBUG:
+        return
+    for warning in check_fragment_cache_is_shared():
+        logger.warning("%s %s", warning.msg, warning.hint)
@@ -0,0 +1,150 @@
+"""Conditional GET and HTTP caching for the project pages.
+
+conditional_page() works like django.views.decorators.http.condition, with
+three differences:
+
+* One validators function supplies both the ETag and the Last-Modified
+  time, so a 304 costs a single query. For the list it costs none: its
+  validators are a version kept in the fragment cache.
+* It also wraps the async views. The validators query runs through
+  sync_to_async.
+* It sets Cache-Control. Anonymous responses are public for
+  CROWDFUND_ANON_CACHE_SECONDS. Everything else is private and
+  revalidated on each use. Cookies such as the CSRF cookie are only set
+  after the template renders, so PrivateCookiesMiddleware makes any
+  response that sets one private again.
+
+The pages differ per visitor: the navigation, the owner controls, the CSRF
+token and flash messages. They depend on the visitor only through the
+session, CSRF and messages cookies, so those cookies are hashed into the
+ETag. Hashing them needs no session lookup.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache import list_version
+from .models import Donation, Project
+
+MESSAGES_COOKIE = "messages"
+
+
+def visitor_cookies(request):
+    names = (settings.SESSION_COOKIE_NAME, settings.CSRF_COOKIE_NAME, MESSAGES_COOKIE)
+    return [request.COOKIES.get(name, "") for name in names]
+
+
+def make_etag(request, parts):
+    raw = "|".join(str(part) for part in [*parts, *visitor_cookies(request)])
+    return '"%s"' % hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def project_detail_validators(request, pk):
+    # the newest donation comes straight off donation_project_created_idx;
+    # MAX(id) per project would scan every donation of a hot project
+    newest = Donation.objects.filter(project=OuterRef("pk")).order_by("-created_at", "-id")
+    project = (
+        Project.objects.filter(pk=pk)
+        .annotate(
+            newest_donation_id=Subquery(newest.values("pk")[:1]),
+            newest_donation_at=Subquery(newest.values("created_at")[:1]),
+        )
+        .first()
+    )
+    if project is None:
+        return None  # let the view answer 404
+    # the detail views render this instance instead of loading it again
+    request.validated_project = project
+    parts = (project.updated_at, project.raised_amount, project.donation_count, project.newest_donation_id)
+    return parts, max(project.updated_at, project.newest_donation_at or project.updated_at)
+
+
+def project_list_validators(request):
+    # no query: project saves and deletes, the running totals and
+    # refresh_trending all bump the list version (projects/cache.py)
+    token, changed_at = list_version()
+    return (token,), changed_at
+
+
+def _precondition(request, validators, args, kwargs):
+    if request.method not in ("GET", "HEAD"):
+        return None, None, None
+    found = validators(request, *args, **kwargs)
+    if found is None:
+        return None, None, None
+    parts, last_modified = found
+    etag = make_etag(request, parts)
+    last_modified = int(last_modified.timestamp())
+    return get_conditional_response(request, etag=etag, last_modified=last_modified), etag, last_modified
+
+
+def _finish(request, response, etag, last_modified):
+    if etag and response.status_code in (200, 304):
+        response.headers.setdefault("ETag", etag)
+        if response.status_code == 200:
+            response.headers.setdefault("Last-Modified", http_date(last_modified))
+    anonymous = settings.SESSION_COOKIE_NAME not in request.COOKIES
+    if anonymous and response.status_code in (200, 304):
+        patch_cache_control(response, public=True, max_age=settings.CROWDFUND_ANON_CACHE_SECONDS)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    # a shared cache must not hand one visitor's CSRF token to another
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def conditional_page(validators):
+    """Answer 304 from `validators(request, *args, **kwargs)` -> (etag parts, last modified) or None."""
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                response, etag, last_modified = await sync_to_async(_precondition)(
+                    request, validators, args, kwargs)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                response, etag, last_modified = _precondition(request, validators, args, kwargs)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+        return inner
+
+    return decorator
+
+
+class PrivateCookiesMiddleware:
+    """Keep responses that set cookies out of shared caches.
+
+    Sits outside the session and CSRF middleware, so it sees every cookie.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.cookies and "public" in response.get("Cache-Control", ""):
+            response.headers["Cache-Control"] = "private, no-cache"
+        return response
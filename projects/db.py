@@ -0,0 +1,50 @@
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection as default_connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Apply CROWDFUND_SQLITE_PRAGMAS to every new connection of the production profile."""
+    if connection.vendor != "sqlite" or settings.CROWDFUND_SQLITE_PROFILE != "production":
+        return
+    if connection.is_in_memory_db():
+        return  # WAL and mmap do not apply to the in-memory test database
+    with connection.cursor() as cursor:
+        for name, value in settings.CROWDFUND_SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def is_busy_error(exc):
+    message = str(exc).lower()
+    return "database is locked" in message or "database table is locked" in message
+
+
+def retry_on_busy(func=None, *, attempts=None, delay=None):
+    """Retry a write transaction when SQLite reports the database as locked.
+
+    The wrapped function must own its transaction; inside an outer atomic
+    block the lock error is re-raised straight away, because only the outer
+    transaction can be retried.
+    """
+    if func is None:
+        return functools.partial(retry_on_busy, attempts=attempts, delay=delay)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        tries = attempts or settings.CROWDFUND_DB_BUSY_RETRIES
+        pause = delay if delay is not None else settings.CROWDFUND_DB_BUSY_DELAY
+        for attempt in range(1, tries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if attempt == tries or not is_busy_error(exc) or default_connection.in_atomic_block:
+                    raise
+                time.sleep(pause * attempt * (1 + random.random()))
+
+    return wrapper
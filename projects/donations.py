@@ -0,0 +1,48 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+from .cache import invalidate_project_fragments, project_list_changed
+from .models import Project, Donation
+
+TOTALS_CHUNK = 500
+
+
+def bump_project_totals(totals, using="default"):
+    """Add {project_id: (amount, count)} to the running totals in one UPDATE."""
+    items = list(totals.items())
+    # keep each statement well under SQLite's bound-parameter limit
+    for start in range(0, len(items), TOTALS_CHUNK):
+        chunk = items[start:start + TOTALS_CHUNK]
+        amount = Case(*[When(pk=pk, then=Value(a)) for pk, (a, _) in chunk], default=Value(0))
+        count = Case(*[When(pk=pk, then=Value(c)) for pk, (_, c) in chunk], default=Value(0))
+        Project.objects.using(using).filter(pk__in=[pk for pk, _ in chunk]).update(
+            raised_amount=F("raised_amount") + amount,
+            donation_count=F("donation_count") + count,
+        )
+    if items:
+        project_list_changed(using)
+
+
+def record_donations(donations, batch_size=None, using="default"):
+    """Insert many donations and their project totals in one transaction.
+
+    bulk_create skips the Donation signals, so the detail fragments of the
+    touched projects are invalidated here once the batch commits.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for donation in donations:
+        entry = totals[donation.project_id]
+        entry[0] += donation.amount
+        entry[1] += 1
+    with transaction.atomic(using=using):
+        Donation.objects.using(using).bulk_create(donations, batch_size=batch_size)
+        bump_project_totals(totals, using)
+        transaction.on_commit(lambda: _invalidate(totals), using=using)
+    return totals
+
+
+def _invalidate(project_ids):
+    for pk in project_ids:
+        invalidate_project_fragments(pk, details=False)
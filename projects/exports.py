@@ -0,0 +1,97 @@
+import csv
+import datetime
+import json
+
+from django.utils import timezone
+
+from .models import Project, Donation
+
+EXPORT_CHUNK_SIZE = 2000
+
+DONATION_COLUMNS = ["id", "project_id", "created_at", "amount", "donor_name", "donor_email", "donor_account"]
+DONATION_FIELDS = ["id", "project_id", "created_at", "amount", "donor_name", "donor_email", "donor__email"]
+
+PROJECT_COLUMNS = [
+    "id", "title", "owner", "target_amount", "raised_amount", "donation_count",
+    "start_date", "end_date", "is_active", "created_at",
+]
+PROJECT_FIELDS = [
+    "id", "title", "owner__email", "target_amount", "raised_amount", "donation_count",
+    "start_date", "end_date", "is_active", "created_at",
+]
+
+
+def date_range_filter(queryset, since=None, until=None, field="created_at"):
+    """Filter on whole local days, as a range the created_at indexes can use."""
+    if since:
+        start = timezone.make_aware(datetime.datetime.combine(since, datetime.time.min))
+        queryset = queryset.filter(**{f"{field}__gte": start})
+    if until:
+        end = timezone.make_aware(datetime.datetime.combine(until + datetime.timedelta(days=1), datetime.time.min))
+        queryset = queryset.filter(**{f"{field}__lt": end})
+    return queryset
+
+
+def donation_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    return queryset.order_by("created_at", "id").values_list(*DONATION_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def project_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    return queryset.order_by("id").values_list(*PROJECT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+# a spreadsheet runs a cell starting with one of these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_cell(value):
+    value = _cell(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # donor names, emails and titles are typed by visitors
+        return "'" + value
+    return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_cell(v) for v in row])
+
+
+def jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, map(_cell, row)))) + "\n"
+
+
+WRITERS = {
+    "csv": (csv_lines, "text/csv"),
+    "jsonl": (jsonl_lines, "application/x-ndjson"),
+}
+
+
+def export_donations(queryset=None, fmt="csv", since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    if queryset is None:
+        queryset = Donation.objects.all()
+    rows = donation_rows(date_range_filter(queryset, since, until), chunk_size)
+    return WRITERS[fmt][0](DONATION_COLUMNS, rows)
+
+
+def export_projects(queryset=None, fmt="csv", since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    if queryset is None:
+        queryset = Project.objects.all()
+    rows = project_rows(date_range_filter(queryset, since, until), chunk_size)
+    return WRITERS[fmt][0](PROJECT_COLUMNS, rows)
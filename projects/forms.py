@@ -1,5 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.contrib.auth.hashers import make_password
+from .auth import hasher
 from .models import User, Project, Donation
 from django.core.validators import RegexValidator
 
@@ -21,10 +23,20 @@ class RegistrationForm(UserCreationForm):
         fields = ('first_name', 'last_name', 'email', 'mobile_phone', 'password1', 'password2')
 
     def clean_email(self):
-        email = self.cleaned_data['email'].lower()
-        if User.objects.filter(email=email).exists():
-            raise forms.ValidationError("This email is already registered.")
-        return email
+        return self.cleaned_data['email'].lower()
+
+    def _get_validation_exclusions(self):
+        # Skips the model's unique and constraint SELECTs on email: the INSERT
+        # meets user_email_lower_uniq anyway, and register() turns its
+        # IntegrityError into a form error. The form field validates the format.
+        return super()._get_validation_exclusions() | {"email"}
+
+    def set_password_and_save(self, user, password_field_name="password1", commit=True):
+        # on the bounded executor shared with login; raises HashingBusy when it is full
+        user.password = hasher().run(make_password, self.cleaned_data[password_field_name])
+        if commit:
+            user.save()
+        return user
 
     def clean_mobile_phone(self):
         mobile_phone = self.cleaned_data.get('mobile_phone', '')
@@ -52,6 +64,19 @@ class ProjectForm(forms.ModelForm):
             'end_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
         }
 
+MIN_DONATION = 1
+MAX_DONATION = 1_000_000
+
+
+def validate_donation_amount(amt):
+    # shared by DonationForm and the import_donations command
+    if amt is None or amt < MIN_DONATION:
+        raise forms.ValidationError("Donation amount must be at least 1 EGP.")
+    if amt > MAX_DONATION:
+        raise forms.ValidationError("Donation amount is too large.")
+    return amt
+
+
 class DonationForm(forms.ModelForm):
     class Meta:
         model = Donation
@@ -63,9 +88,4 @@ class DonationForm(forms.ModelForm):
         }
 
     def clean_amount(self):
-        amt = self.cleaned_data.get("amount")
-        if amt is None or amt < 1:
-            raise forms.ValidationError("Donation amount must be at least 1 EGP.")
-        if amt > 1_000_000:
-            raise forms.ValidationError("Donation amount is too large.")
-        return amt
\ No newline at end of file
+        return validate_donation_amount(self.cleaned_data.get("amount"))
@@ -0,0 +1,151 @@
+"""Write-behind journal for donations (CROWDFUND_DONATION_WRITE_BEHIND).
+
+donate_project appends each validated donation as one JSON line and answers
+immediately. `manage.py drain_donations` applies the journal in batched
+transactions. Progress is a byte offset in a sidecar file, written only
+after the batch commits. Every entry carries a UUID stored in
+Donation.journal_id, so entries replayed after a crash are skipped instead
+of being counted twice.
+"""
+import datetime
+import fcntl
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .donations import record_donations
+from .mail import queue_receipts
+from .models import User, Project, Donation
+
+logger = logging.getLogger(__name__)
+
+
+class DonationJournal:
+    def __init__(self, path=None):
+        self.path = Path(path or settings.CROWDFUND_DONATION_JOURNAL)
+        self.offset_path = self.path.with_name(self.path.name + ".offset")
+
+    def append(self, donation):
+        """Durably record a validated, unsaved Donation; returns its journal id."""
+        entry = {
+            "id": str(uuid.uuid4()),
+            "project_id": donation.project_id,
+            "donor_id": donation.donor_id,
+            "donor_name": donation.donor_name,
+            "donor_email": donation.donor_email,
+            "amount": donation.amount,
+            "created_at": timezone.now().isoformat(),
+        }
+        line = (json.dumps(entry) + "\n").encode()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b"\n":
+                # the tail of an append that crashed or ran out of space: end
+                # it, so it is skipped as one corrupt line instead of
+                # swallowing this entry
+                line = b"\n" + line
+            os.write(fd, line)
+            if settings.CROWDFUND_DONATION_JOURNAL_FSYNC:
+                os.fsync(fd)
+        finally:
+            os.close(fd)  # also releases the lock
+        return entry["id"]
+
+    def read_offset(self):
+        try:
+            return int(self.offset_path.read_text() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def write_offset(self, offset):
+        tmp = self.offset_path.with_name(self.offset_path.name + ".tmp")
+        tmp.write_text(str(offset))
+        os.replace(tmp, self.offset_path)
+
+    def pending(self, limit):
+        """Return (entries, next_offset) for up to `limit` complete lines."""
+        offset = self.read_offset()
+        try:
+            fh = open(self.path, "rb")
+        except FileNotFoundError:
+            return [], 0
+        with fh:
+            if offset > os.fstat(fh.fileno()).st_size:
+                offset = 0  # compacted after the offset was last written
+            fh.seek(offset)
+            entries = []
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break  # an append still in progress
+                offset += len(line)
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logger.error("Skipping corrupt donation journal line at byte %d", offset - len(line))
+                if len(entries) >= limit:
+                    break
+        return entries, offset
+
+    def drain(self, batch_size=1000):
+        """Apply one batch; returns how many new donations were written."""
+        entries, offset = self.pending(batch_size)
+        written = apply_entries(entries) if entries else 0
+        # a batch of corrupt lines only still moves the offset past them
+        if offset != self.read_offset():
+            self.write_offset(offset)
+        if not entries:
+            self.compact()
+        return written
+
+    def compact(self):
+        """Truncate the journal once everything in it has been applied."""
+        if not self.path.exists():
+            return
+        with open(self.path, "r+b") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            if self.read_offset() >= os.fstat(fh.fileno()).st_size:
+                # offset first: a crash in between replays entries that
+                # journal_id skips, instead of leaving a stale offset that
+                # lands in the middle of later appends
+                self.write_offset(0)
+                fh.truncate(0)
+
+
+def apply_entries(entries):
+    with transaction.atomic():
+        ids = [entry["id"] for entry in entries]
+        done = {str(pk) for pk in Donation.objects.filter(journal_id__in=ids).values_list("journal_id", flat=True)}
+        # titles for the receipts
+        live = Project.objects.only("title").in_bulk({entry["project_id"] for entry in entries})
+        donors = set(User.objects.filter(
+            pk__in={entry["donor_id"] for entry in entries if entry["donor_id"]}).values_list("pk", flat=True))
+        donations = []
+        for entry in entries:
+            if entry["id"] in done:
+                continue
+            if entry["project_id"] not in live:
+                logger.warning("Dropping journaled donation %s: project %s no longer exists",
+                               entry["id"], entry["project_id"])
+                continue
+            done.add(entry["id"])
+            donations.append(Donation(
+                journal_id=entry["id"],
+                project=live[entry["project_id"]],
+                donor_id=entry["donor_id"] if entry["donor_id"] in donors else None,
+                donor_name=entry["donor_name"],
+                donor_email=entry["donor_email"],
+                amount=entry["amount"],
+                created_at=datetime.datetime.fromisoformat(entry["created_at"]),
+            ))
+        record_donations(donations)
+        queue_receipts(donations)
+    return len(donations)
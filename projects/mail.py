@@ -0,0 +1,185 @@
+"""Transactional outbox for the emails the site sends.
+
+Views never talk to the mail server. queue_activation() and queue_receipts()
+render the message and insert an OutboxEmail row in the caller's transaction,
+so a mail is queued exactly when the user or donation it belongs to commits.
+Each row carries a dedup key; queueing the same key twice keeps the first row.
+
+send_outbox() (`manage.py send_outbox`) claims due rows for a lease, sends
+them over one reused connection of the configured EMAIL_BACKEND and records
+the outcome in two bulk writes. A failed message is retried with exponential
+backoff and jitter, until CROWDFUND_MAIL_MAX_ATTEMPTS marks it failed. If a
+worker dies mid-batch, its lease runs out and another worker sends the
+rows again, so delivery is at least once.
+"""
+import datetime
+import logging
+import random
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from crowdfund_console.tokens import account_activation_token
+
+from .models import Donation, OutboxEmail, User
+
+logger = logging.getLogger(__name__)
+
+
+def link_context(request=None):
+    if request is not None:
+        return {"protocol": request.scheme, "domain": get_current_site(request).domain}
+    return {"protocol": "https", "domain": Site.objects.get_current().domain}
+
+
+def queue_email(kind, dedup_key, to, subject, template, context):
+    OutboxEmail.objects.bulk_create([OutboxEmail(
+        kind=kind,
+        dedup_key=dedup_key,
+        to=to,
+        subject=subject,
+        body=render_to_string(f"emails/{template}.txt", context),
+        html_body=render_to_string(f"emails/{template}.html", context),
+    )], ignore_conflicts=True)
+
+
+def queue_activation(user, request=None):
+    context = {
+        **link_context(request),
+        "user": user,
+        "uid": urlsafe_base64_encode(force_bytes(user.pk)),
+        "token": account_activation_token.make_token(user),
+    }
+    queue_email(OutboxEmail.ACTIVATION, f"activation:{user.pk}", user.email,
+                "Activate your Crowdfund Console account", "activation", context)
+
+
+def account_emails(donations):
+    """{donor id: email} of the active accounts behind `donations`."""
+    emails, missing = {}, set()
+    for donation in donations:
+        if donation.donor_id is None:
+            continue
+        if Donation.donor.is_cached(donation):
+            if donation.donor.is_active:
+                emails[donation.donor_id] = donation.donor.email
+        else:
+            missing.add(donation.donor_id)
+    if missing:
+        emails.update(User.objects.filter(pk__in=missing, is_active=True).values_list("pk", "email"))
+    return emails
+
+
+def queue_receipts(donations, request=None):
+    """Queue a receipt for each donation made from an account; the donations must be saved.
+
+    Receipts only go to the account's email, which activation verified. A
+    donor_email typed into the form is kept on the donation but never
+    mailed, or anyone could have the site send mail to any address.
+    """
+    emails = account_emails(donations)
+    if not emails:
+        return
+    links = link_context(request)
+    rows = []
+    for donation in donations:
+        if donation.donor_id not in emails:
+            continue
+        context = {**links, "donation": donation, "project": donation.project,
+                   "project_path": reverse("project_detail", kwargs={"pk": donation.project_id})}
+        rows.append(OutboxEmail(
+            kind=OutboxEmail.RECEIPT,
+            dedup_key=f"receipt:{donation.pk}",
+            to=emails[donation.donor_id],
+            subject=f"Your donation to {donation.project.title}",
+            body=render_to_string("emails/receipt.txt", context),
+            html_body=render_to_string("emails/receipt.html", context),
+        ))
+    OutboxEmail.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+
+
+def retry_delay(attempts):
+    base = settings.CROWDFUND_MAIL_RETRY_BASE * 2 ** (attempts - 1)
+    return min(settings.CROWDFUND_MAIL_RETRY_MAX, base) * (0.5 + random.random() / 2)
+
+
+def claim_due(batch_size, now):
+    with transaction.atomic():
+        rows = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        lease = now + datetime.timedelta(seconds=settings.CROWDFUND_MAIL_LEASE_SECONDS)
+        OutboxEmail.objects.filter(pk__in=[row.pk for row in rows]).update(next_attempt_at=lease)
+    return rows
+
+
+def as_message(row, connection):
+    message = EmailMultiAlternatives(row.subject, row.body, settings.DEFAULT_FROM_EMAIL, [row.to],
+                                     connection=connection)
+    if row.html_body:
+        message.attach_alternative(row.html_body, "text/html")
+    return message
+
+
+def send_outbox(batch_size=None, connection=None):
+    """Send one batch of due emails; returns (sent, failed)."""
+    batch_size = batch_size or settings.CROWDFUND_MAIL_BATCH_SIZE
+    now = timezone.now()
+    rows = claim_due(batch_size, now)
+    if not rows:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent, failed = [], []
+    try:
+        connection.open()
+        for row in rows:
+            try:
+                connection.send_messages([as_message(row, connection)])
+            except Exception as exc:
+                logger.warning("Sending outbox email %s to %s failed: %s", row.pk, row.to, exc)
+                row.last_error = f"{type(exc).__name__}: {exc}"[:500]
+                failed.append(row)
+                # the server may have dropped us; start the rest on a fresh connection
+                connection.close()
+                connection.open()
+            else:
+                sent.append(row.pk)
+    except Exception as exc:
+        # could not (re)connect: everything not sent yet is retried later
+        logger.warning("Mail connection failed: %s", exc)
+        done = set(sent) | {row.pk for row in failed}
+        for row in rows:
+            if row.pk not in done:
+                row.last_error = f"{type(exc).__name__}: {exc}"[:500]
+                failed.append(row)
+    finally:
+        connection.close()
+
+    finished = timezone.now()
+    OutboxEmail.objects.filter(pk__in=sent).update(status=OutboxEmail.SENT, sent_at=finished)
+    for row in failed:
+        row.attempts += 1
+        if row.attempts >= settings.CROWDFUND_MAIL_MAX_ATTEMPTS:
+            row.status = OutboxEmail.FAILED
+        else:
+            row.next_attempt_at = finished + datetime.timedelta(seconds=retry_delay(row.attempts))
+    OutboxEmail.objects.bulk_update(failed, ["attempts", "status", "next_attempt_at", "last_error"])
+    return len(sent), len(failed)
+
+
+def purge_sent(days):
+    """Delete sent emails older than `days`; returns how many."""
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted, _ = OutboxEmail.objects.filter(status=OutboxEmail.SENT, sent_at__lt=cutoff).delete()
+    return deleted
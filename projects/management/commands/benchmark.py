@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.benchmarks import SCENARIOS, HttpDriver, InProcessDriver, compare, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot paths (list, search, date filter, detail, donate, login, register). "
+        "Writes to the configured database: run it against seeded scratch data (DJANGO_DB_NAME)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", action="append", dest="scenarios",
+                            help="Only run this scenario (repeatable).")
+        parser.add_argument("--iterations", type=int, default=100)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--url", help="Drive a running server over HTTP instead of the test client.")
+        parser.add_argument("--concurrency", type=int, default=1,
+                            help="Concurrent requests (threads) for either driver.")
+        parser.add_argument("--output", help="Write results as a JSON baseline.")
+        parser.add_argument("--compare", help="Fail if results regress against this JSON baseline.")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Allowed p95 growth as a fraction (default 0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        unknown = set(options["scenarios"] or []) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+        if options["url"]:
+            driver = HttpDriver(options["url"], options["concurrency"])
+        else:
+            driver = InProcessDriver(options["concurrency"])
+        results = run_benchmarks(driver, options["scenarios"], options["iterations"], options["warmup"])
+
+        for name, r in results.items():
+            queries = f"  {r['queries_per_request']:>6} q/req" if "queries_per_request" in r else ""
+            failed = f"  {r['failed']} failed" if r.get("failed") else ""
+            self.stdout.write(
+                f"{name:<12} p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  "
+                f"p99 {r['p99_ms']:>8.2f}ms  {r['rps']:>8.1f} req/s{queries}{failed}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(results, fh, indent=2, sort_keys=True)
+
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                regressions = compare(json.load(fh), results, options["threshold"])
+            if regressions:
+                raise CommandError("Regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.journal import DonationJournal
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply donations from the write-behind journal in batched transactions. "
+        "Run exactly one drainer per journal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--once", action="store_true", help="Drain what is there and exit.")
+        parser.add_argument("--interval", type=float, default=0.5, help="Idle poll interval in seconds.")
+        parser.add_argument("--journal", help="Journal path (default: CROWDFUND_DONATION_JOURNAL).")
+
+    def handle(self, *args, **options):
+        journal = DonationJournal(options["journal"])
+        total = 0
+        try:
+            while True:
+                written = journal.drain(options["batch_size"])
+                total += written
+                if written:
+                    self.stdout.write(f"Applied {written} donation(s).")
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Applied {total} donation(s) from {journal.path}."))
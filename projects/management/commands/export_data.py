@@ -0,0 +1,39 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.exports import EXPORT_CHUNK_SIZE, WRITERS, export_donations, export_projects
+from projects.models import Project, Donation
+
+
+class Command(BaseCommand):
+    help = "Stream donations or projects to CSV/JSONL with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=["donations", "projects"])
+        parser.add_argument("--project", type=int, help="Only donations to this project.")
+        parser.add_argument("--since", type=datetime.date.fromisoformat, help="YYYY-MM-DD, inclusive.")
+        parser.add_argument("--until", type=datetime.date.fromisoformat, help="YYYY-MM-DD, inclusive.")
+        parser.add_argument("--format", choices=list(WRITERS), default="csv")
+        parser.add_argument("--output", help="File to write (default: stdout).")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options["kind"] == "donations":
+            queryset = Donation.objects.all()
+            if options["project"]:
+                queryset = queryset.filter(project_id=options["project"])
+            export = export_donations
+        else:
+            if options["project"]:
+                raise CommandError("--project only applies to donations.")
+            queryset = Project.objects.all()
+            export = export_projects
+
+        lines = export(queryset, options["format"], options["since"], options["until"], options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as fh:
+                fh.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
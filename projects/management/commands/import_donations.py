@@ -0,0 +1,132 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django import forms
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+
+from projects.donations import record_donations
+from projects.forms import validate_donation_amount
+from projects.models import Project, Donation
+
+DONOR_NAME_MAX = Donation._meta.get_field("donor_name").max_length
+
+
+def read_rows(path, fmt):
+    """Yield (line_number, row dict) without loading the file into memory."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        if fmt == "csv":
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = {"_raw": line.rstrip("\n")}
+            yield line_number, row if isinstance(row, dict) else {"_raw": line.rstrip("\n")}
+
+
+def whole_number(value, message):
+    # like DonationForm's IntegerField, 10.9, "1.7" and true are refused
+    # rather than truncated; type() keeps bools out
+    if type(value) is int:
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise forms.ValidationError(message)
+
+
+def text_field(row, name):
+    value = row.get(name)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        # JSONL rows can carry numbers, lists or objects here
+        raise forms.ValidationError(f"{name} must be text.")
+    return value.strip()
+
+
+def clean_row(row):
+    """Validate one partner row with the same rules as DonationForm."""
+    if "_raw" in row:
+        raise forms.ValidationError("Malformed row.")
+    project_id = whole_number(row.get("project_id"), "project_id must be an integer.")
+    amount = validate_donation_amount(whole_number(row.get("amount"), "Enter a whole number."))
+
+    donor_name = text_field(row, "donor_name")
+    if len(donor_name) > DONOR_NAME_MAX:
+        raise forms.ValidationError("donor_name is too long.")
+    donor_email = text_field(row, "donor_email")
+    if donor_email:
+        validate_email(donor_email)
+    return Donation(project_id=project_id, amount=amount, donor_name=donor_name, donor_email=donor_email)
+
+
+class Command(BaseCommand):
+    help = "Import a partner batch of donations from a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per transaction.")
+        parser.add_argument("--rejects", help="Where to write rejected rows (default: <path>.rejects.jsonl).")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist.")
+        fmt = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+        rejects_path = Path(options["rejects"] or f"{path}.rejects.jsonl")
+        chunk_size = options["chunk_size"]
+        using = options["database"]
+
+        imported = rejected = 0
+        started = time.perf_counter()
+        rows = read_rows(path, fmt)
+        with open(rejects_path, "w", encoding="utf-8") as rejects:
+            def reject(line_number, row, errors):
+                rejects.write(json.dumps({"line": line_number, "row": row, "errors": errors}) + "\n")
+
+            while chunk := list(islice(rows, chunk_size)):
+                valid = []
+                for line_number, row in chunk:
+                    try:
+                        valid.append((line_number, row, clean_row(row)))
+                    except forms.ValidationError as e:
+                        reject(line_number, row, e.messages)
+
+                project_ids = {d.project_id for _, _, d in valid}
+                active = set(
+                    Project.objects.using(using)
+                    .filter(pk__in=project_ids, is_active=True)
+                    .values_list("pk", flat=True)
+                )
+                donations = []
+                for line_number, row, donation in valid:
+                    if donation.project_id in active:
+                        donations.append(donation)
+                    else:
+                        reject(line_number, row, ["Project does not exist or is not active."])
+
+                record_donations(donations, using=using)
+                imported += len(donations)
+                rejected += len(chunk) - len(donations)
+
+        elapsed = time.perf_counter() - started
+        rate = (imported + rejected) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} donation(s), rejected {rejected} ({rate:,.0f} rows/sec)."
+        ))
+        if rejected:
+            self.stdout.write(f"Rejected rows written to {rejects_path}")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from projects.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily analytics rollups from all donations, a chunk of projects at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Projects per transaction.")
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups(options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily rollup row(s)."))
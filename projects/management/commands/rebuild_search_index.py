@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from projects.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the project full-text search index from the projects table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        indexed = get_search_backend(options['database']).rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} project(s)."))
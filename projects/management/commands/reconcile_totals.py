@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from projects.cache import project_list_changed
+from projects.models import Project, Donation
+
+
+def _real_totals():
+    per_project = Donation.objects.filter(project=OuterRef('pk')).order_by().values('project')
+    real_amount = Coalesce(Subquery(per_project.annotate(s=Sum('amount')).values('s')), 0)
+    real_count = Coalesce(Subquery(per_project.annotate(c=Count('pk')).values('c')), 0)
+    return real_amount, real_count
+
+
+def reconcile_totals(batch_size=1000, dry_run=False):
+    """Fix raised_amount/donation_count drift, one pk range per transaction.
+
+    Returns the number of projects whose counters did not match their donations.
+    """
+    real_amount, real_count = _real_totals()
+    drifted = 0
+    last_pk = 0
+    while True:
+        pks = list(
+            Project.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return drifted
+        last_pk = pks[-1]
+        with transaction.atomic():
+            bad = list(
+                Project.objects.filter(pk__in=pks)
+                .annotate(real_amount=real_amount, real_count=real_count)
+                .filter(~Q(raised_amount=F('real_amount')) | ~Q(donation_count=F('real_count')))
+                .values_list('pk', flat=True)
+            )
+            drifted += len(bad)
+            if bad and not dry_run:
+                Project.objects.filter(pk__in=bad).update(raised_amount=real_amount, donation_count=real_count)
+                project_list_changed()
+
+
+class Command(BaseCommand):
+    help = "Recompute Project.raised_amount and donation_count from the donations table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Only report drifted projects.")
+
+    def handle(self, *args, **options):
+        drifted = reconcile_totals(options['batch_size'], options['dry_run'])
+        verb = "found" if options['dry_run'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{drifted} project(s) with drifted totals {verb}."))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Fold new donations into the daily analytics rollups, from the Donation.id high-water mark."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--interval", type=float, help="Keep running, refreshing every N seconds.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                processed = refresh_rollups(options["batch_size"])
+                self.stdout.write(f"Folded {processed} donation(s) into the daily rollups.")
+                if not options["interval"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
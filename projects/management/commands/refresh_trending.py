@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = "Recompute the 24h/7d donation velocity behind ?order=trending."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Keep running, refreshing every N seconds.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                trending = refresh_trending()
+                self.stdout.write(f"{trending} project(s) with donations in the last 7 days.")
+                if not options["interval"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,106 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from projects.cache import project_list_changed
+from projects.forms import MAX_DONATION
+from projects.management.commands.reconcile_totals import reconcile_totals
+from projects.models import User, Project, Donation
+from projects.search import get_search_backend
+
+BENCH_PASSWORD = "bench-Passw0rd!"
+WORDS = (
+    "water wells school clinic solar farm library clean energy books village health "
+    "children women coding garden bakery irrigation bridge music art sports"
+).split()
+
+
+def user_email(i):
+    return f"bench-user-{i}@example.com"
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic users, projects and skewed donations for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--projects", type=int, default=5000)
+        parser.add_argument("--donations", type=int, default=100_000)
+        parser.add_argument("--days", type=int, default=90, help="Spread created_at over this many days.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        now = timezone.now()
+        days = options["days"]
+        chunk = options["chunk_size"]
+
+        def moment():
+            return now - datetime.timedelta(seconds=rng.randrange(days * 86400))
+
+        # one hash for everyone: hashing per user would dominate seeding time
+        password = make_password(BENCH_PASSWORD)
+        start = User.objects.count()
+        users = [
+            User(email=user_email(start + i), password=password, first_name=f"User{start + i}",
+                 mobile_phone="01012345678")
+            for i in range(options["users"])
+        ]
+        User.objects.bulk_create(users, batch_size=chunk)
+        user_ids = list(User.objects.values_list("pk", flat=True))
+
+        today = now.date()
+        projects = []
+        for i in range(options["projects"]):
+            title = " ".join(rng.sample(WORDS, 3)).capitalize()
+            starts = today - datetime.timedelta(days=rng.randrange(days))
+            projects.append(Project(
+                owner_id=rng.choice(user_ids),
+                title=f"{title} #{i}",
+                details=" ".join(rng.choices(WORDS, k=rng.randrange(20, 200))),
+                target_amount=rng.randrange(1_000, 1_000_000),
+                start_date=starts,
+                end_date=starts + datetime.timedelta(days=rng.randrange(30, 365)),
+                is_active=rng.random() > 0.05,
+            ))
+        with transaction.atomic():
+            created = Project.objects.bulk_create(projects, batch_size=chunk)
+            for project in created:
+                project.created_at = moment()
+            Project.objects.bulk_update(created, ["created_at"], batch_size=chunk)
+            project_list_changed()
+        get_search_backend().rebuild()
+
+        # Zipf-like popularity: a few campaigns get most of the donations
+        project_ids = [p.pk for p in created if p.is_active]
+        weights = [1 / (rank + 1) ** 1.1 for rank in range(len(project_ids))]
+        remaining = options["donations"]
+        while remaining > 0 and project_ids:
+            n = min(chunk, remaining)
+            targets = rng.choices(project_ids, weights=weights, k=n)
+            donations = [
+                Donation(
+                    project_id=pid,
+                    donor_id=rng.choice(user_ids) if rng.random() < 0.6 else None,
+                    donor_name=f"Donor {rng.randrange(100_000)}",
+                    amount=min(MAX_DONATION, int(rng.paretovariate(1.3) * 50)),
+                )
+                for pid in targets
+            ]
+            with transaction.atomic():
+                Donation.objects.bulk_create(donations)
+                for donation in donations:
+                    donation.created_at = moment()
+                Donation.objects.bulk_update(donations, ["created_at"], batch_size=1000)
+            remaining -= n
+        reconcile_totals()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(created)} projects and {options['donations']} donations "
+            f"(password for bench users: {BENCH_PASSWORD})."
+        ))
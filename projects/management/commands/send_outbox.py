@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from projects.mail import purge_sent, send_outbox
+
+
+class Command(BaseCommand):
+    help = "Send the queued emails in the outbox over one connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.CROWDFUND_MAIL_BATCH_SIZE)
+        parser.add_argument("--interval", type=float, help="Keep running, polling the outbox every N seconds.")
+        parser.add_argument("--purge-days", type=int, help="Also delete emails sent more than N days ago.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                total_sent = total_failed = 0
+                while True:
+                    sent, failed = send_outbox(options["batch_size"])
+                    total_sent += sent
+                    total_failed += failed
+                    if sent + failed < options["batch_size"]:
+                        break
+                self.stdout.write(f"Sent {total_sent} email(s), {total_failed} failed.")
+                if options["purge_days"] is not None:
+                    self.stdout.write(f"Purged {purge_sent(options['purge_days'])} sent email(s).")
+                if not options["interval"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.templating import warm_templates
+
+
+class Command(BaseCommand):
+    help = "Compile every template under templates/ to fill the cached loader and catch syntax errors."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--include-apps", action="store_true", help="Also compile the apps' templates.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count, errors = warm_templates(options["include_apps"])
+        for name, exc in errors:
+            self.stderr.write(f"{name}: {exc}")
+        if errors:
+            raise CommandError(f"{len(errors)} template(s) failed to compile.")
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(f"Compiled {count} template(s) in {elapsed:.0f}ms."))
@@ -0,0 +1,224 @@
+"""Always-on request instrumentation with per-view query budgets.
+
+MetricsMiddleware times every request and, through a database execute
+wrapper installed on each new connection, counts its queries and DB time.
+Template render time comes from projects.templating. Everything is folded
+into in-process histograms keyed by URL name, which the /metrics view
+renders in the Prometheus text format. Each worker process keeps its own
+histograms; scrape every worker or sum them in the query.
+
+CROWDFUND_QUERY_BUDGETS caps the queries per view. A request over budget
+is logged, or fails with QueryBudgetExceeded when
+CROWDFUND_QUERY_BUDGET_ACTION is "raise" (meant for staging and CI).
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55, 100)
+
+HISTOGRAMS = {
+    "crowdfund_request_duration_seconds": ("Request latency by view.", SECONDS_BUCKETS),
+    "crowdfund_request_db_seconds": ("Time spent in database queries per request.", SECONDS_BUCKETS),
+    "crowdfund_request_template_seconds": ("Time spent rendering templates per request.", SECONDS_BUCKETS),
+    "crowdfund_request_queries": ("Database queries per request.", QUERY_BUCKETS),
+}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {}  # (metric, view) -> Histogram
+        self.requests = {}  # (view, status) -> count
+
+    def observe_request(self, view, status, stats):
+        values = {
+            "crowdfund_request_duration_seconds": stats.duration,
+            "crowdfund_request_db_seconds": stats.db_time,
+            "crowdfund_request_template_seconds": stats.template_time,
+            "crowdfund_request_queries": stats.queries,
+        }
+        with self.lock:
+            for metric, value in values.items():
+                histogram = self.histograms.get((metric, view))
+                if histogram is None:
+                    histogram = self.histograms[metric, view] = Histogram(HISTOGRAMS[metric][1])
+                histogram.observe(value)
+            self.requests[view, status] = self.requests.get((view, status), 0) + 1
+
+    def snapshot(self, metric):
+        with self.lock:
+            return sorted(
+                (view, list(h.cumulative()), h.sum, h.count)
+                for (name, view), h in self.histograms.items() if name == metric
+            )
+
+    def request_counts(self):
+        with self.lock:
+            return sorted(self.requests.items())
+
+
+registry = Registry()
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "template_time", "duration")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.duration = 0.0
+
+
+# contextvars follow the request into sync_to_async threads, so async
+# views are measured too
+_current = contextvars.ContextVar("crowdfund_request_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def add_template_time(seconds):
+    stats = _current.get()
+    if stats is not None:
+        stats.template_time += seconds
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "<unresolved>"
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats.duration = time.perf_counter() - started
+            _current.reset(token)
+        return self.process_response(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stats.duration = time.perf_counter() - started
+            _current.reset(token)
+        return self.process_response(request, response, stats)
+
+    def process_response(self, request, response, stats):
+        view = view_name(request)
+        registry.observe_request(view, response.status_code, stats)
+        budget = settings.CROWDFUND_QUERY_BUDGETS.get(view)
+        if budget is not None and stats.queries > budget:
+            message = f"{view} ran {stats.queries} queries, over its budget of {budget} ({request.path})"
+            if settings.CROWDFUND_QUERY_BUDGET_ACTION == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def prometheus_text():
+    lines = []
+    for metric, (help_text, _) in HISTOGRAMS.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for view, buckets, total, count in registry.snapshot(metric):
+            for bound, cumulative in buckets:
+                lines.append(f"{metric}_bucket{_labels(view=view, le=bound)} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(view=view)} {total}")
+            lines.append(f"{metric}_count{_labels(view=view)} {count}")
+
+    lines += ["# HELP crowdfund_requests_total Requests by view and status.",
+              "# TYPE crowdfund_requests_total counter"]
+    for (view, status), count in registry.request_counts():
+        lines.append(f"crowdfund_requests_total{_labels(view=view, status=status)} {count}")
+
+    from .templating import render_stats
+
+    templates = render_stats()
+    lines += ["# HELP crowdfund_template_renders_total Top-level renders by template.",
+              "# TYPE crowdfund_template_renders_total counter"]
+    lines += [f"crowdfund_template_renders_total{_labels(template=name)} {s['count']}"
+              for name, s in sorted(templates.items())]
+    lines += ["# HELP crowdfund_template_render_seconds_total Render time by template.",
+              "# TYPE crowdfund_template_render_seconds_total counter"]
+    lines += [f"crowdfund_template_render_seconds_total{_labels(template=name)} {s['total_ms'] / 1000}"
+              for name, s in sorted(templates.items())]
+    return "\n".join(lines) + "\n"
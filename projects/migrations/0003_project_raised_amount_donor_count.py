@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Donation = apps.get_model('projects', 'Donation')
+    db = schema_editor.connection.alias
+    per_project = Donation.objects.using(db).filter(project=OuterRef('pk')).order_by().values('project')
+    Project.objects.using(db).update(
+        raised_amount=Coalesce(Subquery(per_project.annotate(s=Sum('amount')).values('s')), 0),
+        donor_count=Coalesce(Subquery(per_project.annotate(c=Count('pk')).values('c')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_alter_project_details_alter_project_target_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='donor_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='raised_amount',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
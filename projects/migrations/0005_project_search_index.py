@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS projects_project_fts "
+            "USING fts5(title, details, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO projects_project_fts(rowid, title, details) "
+            "SELECT id, title, details FROM projects_project"
+        )
+    elif vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        Project = apps.get_model('projects', 'Project')
+        vector = (
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('details', weight='B', config='english')
+        )
+        schema_editor.add_index(Project, GinIndex(vector, name='project_search_gin'))
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS projects_project_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS project_search_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
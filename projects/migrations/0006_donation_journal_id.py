@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_project_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donation',
+            name='journal_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='donation',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_donation_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTrend',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='projects.project')),
+                ('amount_24h', models.PositiveBigIntegerField(default=0)),
+                ('donations_24h', models.PositiveIntegerField(default=0)),
+                ('amount_7d', models.PositiveBigIntegerField(default=0)),
+                ('donations_7d', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['created_at'], name='donation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-raised_amount', '-id'], name='project_active_raised_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-donor_count', '-id'], name='project_active_donors_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projecttrend',
+            index=models.Index(fields=['-amount_24h', 'project'], name='trend_24h_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projecttrend',
+            index=models.Index(fields=['-amount_7d', 'project'], name='trend_7d_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:20
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_leaderboards_trending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(django.db.models.functions.text.Lower('donor_email'), name='donation_email_lower_idx'),
+        ),
+    ]
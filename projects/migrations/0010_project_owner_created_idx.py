@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_donation_email_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='project_owner_created_idx'),
+        ),
+    ]
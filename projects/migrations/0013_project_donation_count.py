@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_user_email_lower_unique'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='project',
+            name='project_active_donors_idx',
+        ),
+        # the counter goes up once per donation, not once per donor
+        migrations.RenameField(
+            model_name='project',
+            old_name='donor_count',
+            new_name='donation_count',
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-donation_count', '-id'], name='project_active_donations_idx'),
+        ),
+    ]
@@ -2,7 +2,10 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+
+from .cache import project_list_changed
 
 
 
@@ -23,6 +26,11 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
+    def get_by_email(self, email):
+        # Compare on LOWER(email) so the functional index is usable; iexact
+        # compiles to LIKE on SQLite and UPPER() on PostgreSQL.
+        return self.alias(email_lower=Lower("email")).get(email_lower=email.lower())
+
 
 class User(AbstractUser):
     username = None
@@ -43,6 +51,15 @@ class User(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # one account per address whatever its case; its index also
+            # serves get_by_email and the admin's prefix search
+            models.UniqueConstraint(
+                Lower("email"), name="user_email_lower_uniq", violation_error_message="This email is already registered."
+            ),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -66,6 +83,31 @@ class Project(models.Model):
 
     is_active = models.BooleanField(default=True)
 
+    # Running totals maintained by donate_project; reconcile with
+    # `manage.py reconcile_totals` if they ever drift from the donations.
+    # donation_count counts donations, so a repeat donor counts again.
+    raised_amount = models.PositiveBigIntegerField(default=0, editable=False)
+    donation_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"], condition=Q(is_active=True), name="project_active_created_idx"
+            ),
+            models.Index(
+                fields=["start_date", "end_date"], condition=Q(is_active=True), name="project_active_window_idx"
+            ),
+            # leaderboards: ?order=funded and ?order=donations
+            models.Index(
+                fields=["-raised_amount", "-id"], condition=Q(is_active=True), name="project_active_raised_idx"
+            ),
+            models.Index(
+                fields=["-donation_count", "-id"], condition=Q(is_active=True), name="project_active_donations_idx"
+            ),
+            # the owner dashboard (my_projects), newest first
+            models.Index(fields=["owner", "-created_at", "-id"], name="project_owner_created_idx"),
+        ]
+
     def clean(self):
         from django.core.exceptions import ValidationError
 
@@ -80,7 +122,24 @@ class Project(models.Model):
         return self.owner
 
     def total_donated(self):
-        return self.donations.aggregate(total=Sum('amount'))['total'] or 0
+        return self.raised_amount
+
+    @property
+    def percent_funded(self):
+        if not self.target_amount:
+            return 0
+        return min(100, self.raised_amount * 100 // self.target_amount)
+
+    @property
+    def days_remaining(self):
+        return max(0, (self.end_date - timezone.localdate()).days)
+
+    def add_donation_totals(self, amount, count=1):
+        Project.objects.filter(pk=self.pk).update(
+            raised_amount=F('raised_amount') + amount,
+            donation_count=F('donation_count') + count,
+        )
+        project_list_changed()
 
     def __str__(self):
         return self.title
@@ -94,12 +153,108 @@ class Donation(models.Model):
     donor_name = models.CharField(max_length=200, blank=True)
     donor_email = models.EmailField(blank=True)
     amount = models.PositiveIntegerField()  # amount in EGP
-    created_at = models.DateTimeField(auto_now_add=True)
+    # a default rather than auto_now_add so journaled/imported donations keep their own time
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # set for donations accepted through the write-behind journal; makes replay idempotent
+    journal_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["project", "-created_at", "-id"], name="donation_project_created_idx"),
+            # the sliding windows scanned by projects.trending
+            models.Index(fields=["created_at"], name="donation_created_idx"),
+            # prefix search on the donor email in the admin
+            models.Index(Lower("donor_email"), name="donation_email_lower_idx"),
+        ]
 
     def __str__(self):
         if self.donor:
             return f"{self.donor.email} -> {self.project.title} : {self.amount} EGP"
         return f"{self.donor_name or self.donor_email} -> {self.project.title} : {self.amount} EGP"
+
+
+class DonationDailyRollup(models.Model):
+    """Donations per project and local day, maintained by projects.rollups."""
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="daily_rollups")
+    day = models.DateField()
+    amount_sum = models.PositiveBigIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+    unique_donors = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["project", "day"], name="rollup_project_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id} {self.day}: {self.amount_sum} EGP / {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """Highest Donation.id already folded into a rollup table."""
+
+    name = models.CharField(max_length=100, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
+class ProjectTrend(models.Model):
+    """Donation velocity over the trending windows, rewritten by projects.trending."""
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name="trend")
+    amount_24h = models.PositiveBigIntegerField(default=0)
+    donations_24h = models.PositiveIntegerField(default=0)
+    amount_7d = models.PositiveBigIntegerField(default=0)
+    donations_7d = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-amount_24h", "project"], name="trend_24h_idx"),
+            models.Index(fields=["-amount_7d", "project"], name="trend_7d_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}: {self.amount_24h} EGP/24h, {self.amount_7d} EGP/7d"
+
+
+class OutboxEmail(models.Model):
+    """An email waiting for, or done with, the projects.mail worker."""
+
+    ACTIVATION = "activation"
+    RECEIPT = "receipt"
+    KIND_CHOICES = [(ACTIVATION, "Account activation"), (RECEIPT, "Donation receipt")]
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # "activation:<user id>" / "receipt:<donation id>"; a second enqueue is ignored
+    dedup_key = models.CharField(max_length=100, unique=True)
+    to = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at", "id"], condition=Q(status="pending"), name="outbox_due_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {self.to} ({self.status})"
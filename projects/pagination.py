@@ -0,0 +1,95 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset paginator over (created_at, id), newest first.
+
+    Each page is a single indexed range scan with LIMIT per_page + 1, so it
+    costs the same no matter how deep it is, and no COUNT(*) is issued.
+    Cursors are opaque url-safe tokens encoding the boundary row's key.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.order_by("-created_at", "-id")
+        self.per_page = per_page
+
+    def encode_cursor(self, obj, direction):
+        payload = json.dumps([direction, obj.created_at.isoformat(), obj.pk])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, token):
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            direction, created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+            created_at = datetime.datetime.fromisoformat(created_at)
+        except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+            raise InvalidCursor(token)
+        if direction not in ("n", "p") or not isinstance(pk, int):
+            raise InvalidCursor(token)
+        return direction, created_at, pk
+
+    def _query(self, cursor):
+        if not cursor:
+            return self.queryset[:self.per_page + 1], None
+        direction, created_at, pk = self.decode_cursor(cursor)
+        if direction == "n":
+            after = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            return self.queryset.filter(after)[:self.per_page + 1], direction
+        before = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        return self.queryset.filter(before).order_by("created_at", "id")[:self.per_page + 1], direction
+
+    def _finish(self, rows, direction):
+        if direction is None:
+            return self._build(rows, has_before=False)
+        if direction == "n":
+            return self._build(rows, has_before=True)
+        has_before = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return self._build(rows, has_before=has_before, has_after=True)
+
+    def page(self, cursor=None):
+        query, direction = self._query(cursor)
+        return self._finish(list(query), direction)
+
+    async def apage(self, cursor=None):
+        query, direction = self._query(cursor)
+        return self._finish([obj async for obj in query], direction)
+
+    def _build(self, rows, has_before, has_after=None):
+        if has_after is None:
+            has_after = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+        next_cursor = self.encode_cursor(rows[-1], "n") if rows and has_after else None
+        previous_cursor = self.encode_cursor(rows[0], "p") if rows and has_before else None
+        return CursorPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,86 @@
+"""Primary/replica routing with read-your-writes stickiness.
+
+Reads go to a weighted random replica from CROWDFUND_DB_REPLICAS only while
+a safe (GET/HEAD/OPTIONS) request from a client without the sticky cookie
+is being served. Writes, unsafe requests, requests that carry the cookie,
+and everything outside a request (management commands, workers) use the
+primary. ReadYourWritesMiddleware sets the cookie after a successful
+write, so the writer sees its own changes until replicas catch up.
+"""
+import contextlib
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PRIMARY = "default"
+STICKY_COOKIE = "cf_primary"
+
+_use_replicas = contextvars.ContextVar("crowdfund_use_replicas", default=False)
+
+
+@contextlib.contextmanager
+def pin_to_primary():
+    token = _use_replicas.set(False)
+    try:
+        yield
+    finally:
+        _use_replicas.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.CROWDFUND_DB_REPLICAS
+        if not replicas or not _use_replicas.get():
+            return PRIMARY
+        aliases, weights = zip(*replicas.items())
+        return random.choices(aliases, weights)[0]
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold copies of the primary's data, so any pair may relate
+        return True
+
+
+class ReadYourWritesMiddleware:
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _use_replicas.set(self.may_use_replicas(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replicas.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = _use_replicas.set(self.may_use_replicas(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replicas.reset(token)
+        return self.process_response(request, response)
+
+    def may_use_replicas(self, request):
+        return request.method in self.SAFE_METHODS and STICKY_COOKIE not in request.COOKIES
+
+    def process_response(self, request, response):
+        if request.method not in self.SAFE_METHODS and response.status_code < 400 \
+                and settings.CROWDFUND_DB_REPLICAS:
+            response.set_cookie(
+                STICKY_COOKIE, "1", max_age=settings.CROWDFUND_DB_STICKY_SECONDS,
+                httponly=True, samesite="Lax",
+            )
+        return response
@@ -0,0 +1,121 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+FTS_TABLE = "projects_project_fts"
+
+# Snippet markers; escaped and turned into <mark> by the `highlight` filter so
+# project text can never inject markup.
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+
+def tokenize(query):
+    return re.findall(r"\w+", query.lower())
+
+
+class BasicSearchBackend:
+    """Fallback for engines without a full-text index: unranked LIKE scan."""
+
+    def __init__(self, using="default"):
+        self.using = using
+
+    def index(self, project):
+        pass
+
+    def remove(self, pk):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, queryset, query):
+        for term in tokenize(query):
+            queryset = queryset.filter(Q(title__icontains=term) | Q(details__icontains=term))
+        return queryset
+
+
+class SQLiteFTSBackend(BasicSearchBackend):
+    """FTS5 index over title and details, ranked with bm25 (title weighted 10x)."""
+
+    def index(self, project):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, title, details) VALUES (%s, %s, %s)",
+                [project.pk, project.title, project.details],
+            )
+
+    def remove(self, pk):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, details) SELECT id, title, details FROM projects_project"
+            )
+            return cursor.rowcount
+
+    def search(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        match = " ".join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            select={
+                "search_rank": f"bm25({FTS_TABLE}, 10.0, 1.0)",
+                "search_snippet": f"snippet({FTS_TABLE}, 1, %s, %s, '…', 24)",
+            },
+            select_params=[MARK_START, MARK_END],
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = projects_project.id", f"{FTS_TABLE} MATCH %s"],
+            params=[match],
+            order_by=["search_rank", "-id"],
+        )
+
+
+def project_search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    # Must stay identical to the expression indexed by migration 0005.
+    return (
+        SearchVector("title", weight="A", config="english")
+        + SearchVector("details", weight="B", config="english")
+    )
+
+
+class PostgresSearchBackend(BasicSearchBackend):
+    """Ranked search over the GIN-indexed tsvector expression; nothing to sync."""
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+
+        if not tokenize(query):
+            return queryset.none()
+        vector = project_search_vector()
+        search_query = SearchQuery(query, config="english", search_type="websearch")
+        return (
+            queryset.annotate(search_vector=vector)
+            .filter(search_vector=search_query)
+            .annotate(
+                search_rank=SearchRank(vector, search_query),
+                search_snippet=SearchHeadline(
+                    "details", search_query, config="english",
+                    start_sel=MARK_START, stop_sel=MARK_END, max_words=24, min_words=8,
+                ),
+            )
+            .order_by("-search_rank", "-id")
+        )
+
+
+BACKENDS = {
+    "sqlite": SQLiteFTSBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend(using="default"):
+    vendor = connections[using].vendor
+    return BACKENDS.get(vendor, BasicSearchBackend)(using)
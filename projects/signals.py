@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import user_cache
+from .cache import invalidate_project_fragments, project_list_changed
+from .db import tune_sqlite_connection  # noqa: F401  (connection_created receiver)
+from .metrics import install_query_metrics  # noqa: F401  (connection_created receiver)
+from .models import User, Project, Donation
+from .search import get_search_backend
+
+
+def invalidate_fragments(pk, using, details=True):
+    # Drop now and again after commit, so a render that raced the write
+    # cannot leave a stale fragment behind.
+    invalidate_project_fragments(pk, details)
+    transaction.on_commit(lambda: invalidate_project_fragments(pk, details), using=using)
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, using, **kwargs):
+    get_search_backend(using).index(instance)
+    invalidate_fragments(instance.pk, using)
+    project_list_changed(using)
+
+
+@receiver(post_delete, sender=Project)
+def unindex_project(sender, instance, using, **kwargs):
+    get_search_backend(using).remove(instance.pk)
+    invalidate_fragments(instance.pk, using)
+    project_list_changed(using)
+
+
+@receiver(post_save, sender=Donation)
+@receiver(post_delete, sender=Donation)
+def donation_changed(sender, instance, using, **kwargs):
+    invalidate_fragments(instance.project_id, using, details=False)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # covers password changes and is_active toggles, which both save the user
+    user_cache.invalidate(instance.pk)
@@ -0,0 +1,198 @@
+"""Production static files: hashed names, precompressed copies, in-process serving.
+
+CompressedManifestStaticFilesStorage is ManifestStaticFilesStorage that, at
+collectstatic time, also writes a .gz (and a .br when the optional `brotli`
+package is installed) next to each compressible file, when compressing saves
+something.
+
+StaticFilesMiddleware serves STATIC_ROOT from the Django process, for
+gunicorn deployments without a proxy in front. It indexes the directory once
+at startup. Each response uses the smallest encoding the client accepts, and
+carries an ETag and Vary: Accept-Encoding. Files with a content hash in their
+name, per staticfiles.json, are cached for a year as immutable; any other
+file is cached for CROWDFUND_STATIC_MAX_AGE seconds.
+"""
+import gzip
+import json
+import mimetypes
+import os
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone still covers every browser
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript", "application/json", "application/manifest+json",
+    "application/xml", "image/svg+xml", "text/javascript",
+}
+# below this, the headers outweigh what compression saves
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE = "public, max-age=31536000, immutable"
+# files up to this size are answered from one read, larger ones are streamed
+INLINE_LIMIT = 256 * 1024
+
+
+def is_compressible(name):
+    content_type, encoding = mimetypes.guess_type(name)
+    if encoding or content_type is None:
+        return False
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+
+
+def compressed_variants(data):
+    """{suffix: bytes} for the encodings that make `data` smaller."""
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return {suffix: blob for suffix, blob in variants.items() if len(blob) < len(data) * 0.95}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        written = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if not dry_run and not isinstance(processed, Exception):
+                written.update(filter(None, (name, hashed_name)))
+        if not dry_run:
+            for name in sorted(written):
+                self.compress(name)
+
+    def compress(self, name):
+        if not is_compressible(name):
+            return
+        path = Path(self.path(name))
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, blob in compressed_variants(data).items():
+            path.with_name(path.name + suffix).write_bytes(blob)
+
+
+class StaticFile:
+    __slots__ = ("content_type", "variants", "cache_control")
+
+    def __init__(self, content_type, variants, cache_control):
+        self.content_type = content_type
+        # [(content-encoding or None, path, size, etag, mtime)], smallest first
+        self.variants = variants
+        self.cache_control = cache_control
+
+
+def hashed_names(root):
+    try:
+        with open(root / "staticfiles.json", encoding="utf-8") as fh:
+            return set(json.load(fh).get("paths", {}).values())
+    except (OSError, ValueError):
+        return set()
+
+
+def build_index(root, url_prefix, max_age):
+    """{url path: StaticFile} for every file under `root`."""
+    immutable = hashed_names(root)
+    encodings = {".br": "br", ".gz": "gzip"}
+    index = {}
+    for directory, _, filenames in os.walk(root):
+        present = set(filenames)
+        for filename in filenames:
+            stem, suffix = os.path.splitext(filename)
+            if suffix in encodings and stem in present:
+                continue  # a precompressed copy, served through its original
+            path = Path(directory, filename)
+            name = path.relative_to(root).as_posix()
+            variants = []
+            for variant_suffix, encoding in (("", None), *encodings.items()):
+                if variant_suffix and filename + variant_suffix not in present:
+                    continue
+                variant = Path(directory, filename + variant_suffix)
+                stat = variant.stat()
+                etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}{"-" + encoding if encoding else ""}"'
+                variants.append((encoding, variant, stat.st_size, etag, stat.st_mtime))
+            variants.sort(key=lambda v: v[2])
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            if is_compressible(filename):
+                content_type += "; charset=utf-8"
+            cache_control = IMMUTABLE if name in immutable else f"public, max-age={max_age}"
+            index[url_prefix + name] = StaticFile(content_type, variants, cache_control)
+    return index
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """Serve STATIC_ROOT from memory-indexed files when CROWDFUND_SERVE_STATIC is on."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.CROWDFUND_SERVE_STATIC or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith("/") else "/" + settings.STATIC_URL
+        root = Path(settings.STATIC_ROOT)
+        self.files = build_index(root, self.prefix, settings.CROWDFUND_STATIC_MAX_AGE) if root.is_dir() else {}
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.serve(request)
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        response = self.serve(request)
+        return response if response is not None else await self.get_response(request)
+
+    def serve(self, request):
+        if not request.path_info.startswith(self.prefix) or request.method not in ("GET", "HEAD"):
+            return None
+        static = self.files.get(request.path_info)
+        if static is None:
+            return None
+        accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        encoding, path, size, etag, mtime = next(
+            v for v in static.variants if v[0] is None or v[0] in accepted)
+
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            response = HttpResponseNotModified()
+        elif request.method == "HEAD":
+            response = HttpResponse(content_type=static.content_type)
+        elif size <= INLINE_LIMIT:
+            # one read; no sync file iterator for the ASGI handler to wrap
+            response = HttpResponse(path.read_bytes(), content_type=static.content_type)
+        else:
+            response = FileResponse(path.open("rb"), content_type=static.content_type)
+        if response.status_code == 200:
+            response["Content-Length"] = str(size)
+            response["Last-Modified"] = http_date(mtime)
+            if encoding:
+                response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        response["Cache-Control"] = static.cache_control
+        if len(static.variants) > 1:
+            response["Vary"] = "Accept-Encoding"
+        return response
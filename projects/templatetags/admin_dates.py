@@ -0,0 +1,97 @@
+import datetime
+
+from django import template
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.db.models import Max, Min
+from django.utils import formats, timezone
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+def _local(value):
+    return timezone.localtime(value) if isinstance(value, datetime.datetime) and timezone.is_aware(value) else value
+
+
+def range_date_hierarchy(cl):
+    """Django's date_hierarchy, with the links derived from Min/Max of the list.
+
+    The stock tag lists the years, months or days with a DISTINCT over the
+    date field, which reads every row of the current selection. Min and Max
+    come off the field's index in one lookup each; the periods between them are
+    all offered, including any without rows.
+    """
+    field_name = cl.date_hierarchy
+    year_field, month_field, day_field = (f"{field_name}__{part}" for part in ("year", "month", "day"))
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field_name}__"])
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            "show": True,
+            "back": {
+                "link": link({year_field: year_lookup, month_field: month_lookup}),
+                "title": capfirst(formats.date_format(day, "YEAR_MONTH_FORMAT")),
+            },
+            "choices": [{"title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT"))}],
+        }
+
+    # cl.queryset is already narrowed to the selected year or month. Two
+    # queries on purpose: SQLite only answers a lone MIN() or MAX() from an index.
+    first = cl.queryset.aggregate(value=Min(field_name))["value"]
+    if first is None:
+        return {"show": True, "back": None, "choices": []}
+    last = cl.queryset.aggregate(value=Max(field_name))["value"]
+    first, last = _local(first), _local(last)
+    if not (year_lookup or month_lookup) and first.year == last.year:
+        year_lookup = first.year
+        if first.month == last.month:
+            month_lookup = first.month
+
+    if year_lookup and month_lookup:
+        days = [datetime.date(first.year, first.month, d) for d in range(first.day, last.day + 1)]
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year_lookup}), "title": str(year_lookup)},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+                    "title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT")),
+                }
+                for day in days
+            ],
+        }
+    if year_lookup:
+        months = [datetime.date(first.year, m, 1) for m in range(first.month, last.month + 1)]
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month.month}),
+                    "title": capfirst(formats.date_format(month, "YEAR_MONTH_FORMAT")),
+                }
+                for month in months
+            ],
+        }
+    return {
+        "show": True,
+        "back": None,
+        "choices": [
+            {"link": link({year_field: str(year)}), "title": str(year)}
+            for year in range(first.year, last.year + 1)
+        ],
+    }
+
+
+@register.tag(name="range_date_hierarchy")
+def range_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser, token, func=range_date_hierarchy, template_name="date_hierarchy.html", takes_context=False
+    )
@@ -0,0 +1,14 @@
+from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from projects.search import MARK_END, MARK_START
+
+register = template.Library()
+
+
+@register.filter
+def highlight(snippet):
+    if not snippet:
+        return ""
+    return mark_safe(escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
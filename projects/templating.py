@@ -0,0 +1,110 @@
+"""Template backend with per-template render timing, and template warm-up.
+
+InstrumentedDjangoTemplates is DjangoTemplates whose templates record how
+long each top-level render took (included and extended templates count
+towards the template that was rendered). render_stats() returns the totals
+for this process; renders slower than CROWDFUND_SLOW_RENDER_MS are logged.
+
+warm_templates() compiles every template under the TEMPLATES DIRS so that
+the cached loader of the production profile is filled before the first
+request; wsgi.py and asgi.py call it when CROWDFUND_WARM_TEMPLATES is on.
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .metrics import add_template_time
+
+logger = logging.getLogger(__name__)
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class RenderStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+def record_render(name, seconds):
+    add_template_time(seconds)
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = RenderStats()
+        stats.add(seconds)
+    if seconds * 1000 >= settings.CROWDFUND_SLOW_RENDER_MS:
+        logger.warning("Slow template render: %s took %.1fms", name, seconds * 1000)
+
+
+def render_stats(reset=False):
+    """{template name: {count, total_ms, mean_ms, max_ms}} for this process."""
+    with _stats_lock:
+        snapshot = {name: stats.as_dict() for name, stats in _stats.items()}
+        if reset:
+            _stats.clear()
+    return snapshot
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record_render(self.origin.template_name or "<string>", time.perf_counter() - started)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def template_names(directories):
+    for directory in map(Path, directories):
+        for path in sorted(directory.rglob("*")):
+            if path.is_file() and not path.name.startswith("."):
+                yield path.relative_to(directory).as_posix()
+
+
+def warm_templates(include_apps=False):
+    """Compile the project's templates (and the apps' with include_apps); returns (count, errors)."""
+    engine = engines["django"]
+    directories = engine.template_dirs if include_apps else engine.dirs
+    count, errors = 0, []
+    for name in template_names(directories):
+        try:
+            engine.get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+            errors.append((name, exc))
+        else:
+            count += 1
+    return count, errors
@@ -1,3 +1,1794 @@
-from django.test import TestCase
+import csv
+import datetime
+import importlib
+import io
+import json
+import os
+import socketserver
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from contextlib import closing
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import caches
+from django.template import engines
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.core.management import call_command
+from django.db import OperationalError
+from django.db.models.functions import Lower
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import urlsafe_base64_encode
+
+try:
+    import redis
+except ImportError:  # optional, only needed for CROWDFUND_FRAGMENT_CACHE=redis
+    redis = None
+
+from . import async_views, auth, views
+from .backends import EmailBackend, user_cache
+from .benchmarks import SCENARIOS, InProcessDriver, compare, run_benchmarks
+from .cache import LIST_VERSION_KEY
+from .checks import check_fragment_cache_is_shared, warn_unshared_caches
+from .db import retry_on_busy
+from .donations import record_donations
+from .exports import export_donations, export_projects
+from .journal import DonationJournal
+from .mail import queue_activation, queue_receipts, send_outbox
+from .metrics import Histogram, QueryBudgetExceeded, registry
+from .models import User, Project, Donation, DonationDailyRollup, OutboxEmail, RollupWatermark
+from .rollups import rebuild_rollups, refresh_rollups
+from .templating import render_stats, warm_templates
+from .trending import refresh_trending
+from .routers import STICKY_COOKIE, PrimaryReplicaRouter, ReadYourWritesMiddleware, pin_to_primary
+from .staticfiles import StaticFilesMiddleware
+from .views import ProjectListView
+
+
+def make_user(email="owner@example.com", password="S3cure-pass!"):
+    return User.objects.create_user(email=email, password=password, first_name="Test", mobile_phone="01012345678")
+
+
+def make_project(owner, title="Water wells", **kwargs):
+    today = timezone.now().date()
+    kwargs.setdefault("details", "Drilling wells in Upper Egypt.")
+    kwargs.setdefault("target_amount", 50_000)
+    kwargs.setdefault("start_date", today - datetime.timedelta(days=1))
+    kwargs.setdefault("end_date", today + datetime.timedelta(days=30))
+    return Project.objects.create(owner=owner, title=title, **kwargs)
+
+
+class ProjectTotalsTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.project = make_project(self.owner)
+
+    def test_donate_updates_running_totals(self):
+        url = reverse("project_donate", kwargs={"pk": self.project.pk})
+        self.client.post(url, {"donor_name": "A", "amount": 100})
+        self.client.post(url, {"donor_name": "B", "amount": 250})
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.raised_amount, 350)
+        self.assertEqual(self.project.donation_count, 2)
+        self.assertEqual(self.project.total_donated(), 350)
+
+    def test_invalid_donation_leaves_totals_untouched(self):
+        url = reverse("project_donate", kwargs={"pk": self.project.pk})
+        self.client.post(url, {"amount": 0})
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.raised_amount, 0)
+        self.assertFalse(self.project.donations.exists())
+
+    def test_detail_page_reads_total_without_aggregate(self):
+        Donation.objects.create(project=self.project, amount=75)
+        self.project.add_donation_totals(75)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("project_detail", kwargs={"pk": self.project.pk}))
+            response.render()
+        self.assertContains(response, "75 EGP")
+
+    def test_reconcile_totals_fixes_drift(self):
+        other = make_project(self.owner, title="Schools")
+        Donation.objects.create(project=self.project, amount=40)
+        Donation.objects.create(project=self.project, amount=60)
+        Project.objects.filter(pk=other.pk).update(raised_amount=999, donation_count=9)
+
+        call_command("reconcile_totals", batch_size=1, stdout=io.StringIO())
+
+        self.project.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.project.raised_amount, self.project.donation_count), (100, 2))
+        self.assertEqual((other.raised_amount, other.donation_count), (0, 0))
+
+
+class ProjectListQueryCountTests(TestCase):
+    def setUp(self):
+        owner = make_user()
+        projects = [make_project(owner, title=f"Project {i}") for i in range(200)]
+        for project in projects[::3]:
+            Donation.objects.create(project=project, amount=10)
+            project.add_donation_totals(10)
+
+    def test_list_query_count_is_independent_of_page_size(self):
+        for size in (10, 50, 200):
+            with self.subTest(page_size=size), \
+                    mock.patch.object(ProjectListView, "paginate_by", size), \
+                    self.assertNumQueries(2):
+                response = self.client.get(reverse("project_list"))
+                self.assertEqual(len(response.context["projects"]), size)
+                self.assertContains(response, "Raised:", count=size)
+
+    def test_list_shows_percent_funded(self):
+        Project.objects.update(raised_amount=12_500, donation_count=3)
+        response = self.client.get(reverse("project_list"))
+        self.assertContains(response, "Raised: 12500 / 50000 EGP")
+        self.assertContains(response, "(25%)")
+        self.assertContains(response, "3 donations")
+
+
+@override_settings(CROWDFUND_CURSOR_PAGINATION=True)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.projects = [make_project(self.owner, title=f"Project {i}") for i in range(25)]
+        # identical timestamps exercise the id tie-breaker
+        Project.objects.filter(pk__in=[p.pk for p in self.projects[5:15]]).update(
+            created_at=self.projects[5].created_at
+        )
+
+    def test_walks_forward_and_back_over_every_project(self):
+        expected = list(Project.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+        seen, pages, cursor = [], [], None
+        while True:
+            response = self.client.get(reverse("project_list"), {"cursor": cursor} if cursor else {})
+            page = response.context["page_obj"]
+            seen += [p.pk for p in page]
+            pages.append([p.pk for p in page])
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+
+        response = self.client.get(reverse("project_list"), {"cursor": page.previous_cursor})
+        self.assertEqual([p.pk for p in response.context["page_obj"]], pages[-2])
+
+    def test_cursor_page_skips_count_query(self):
+        first = self.client.get(reverse("project_list")).context["page_obj"]
+        with self.assertNumQueries(1):
+            self.client.get(reverse("project_list"), {"cursor": first.next_cursor})
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse("project_list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_donation_history_is_cursor_paginated(self):
+        project = self.projects[0]
+        Donation.objects.bulk_create(Donation(project=project, amount=i + 1) for i in range(60))
+        url = reverse("project_donations", kwargs={"pk": project.pk})
+
+        first = self.client.get(url).context["page_obj"]
+        self.assertEqual(len(first), 50)
+        second = self.client.get(url, {"cursor": first.next_cursor}).context["page_obj"]
+        self.assertEqual(len(second), 10)
+        self.assertFalse(second.has_next())
+        self.assertTrue(second.has_previous())
+
+
+class HotQueryIndexTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.project = make_project(self.owner)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf"USING (COVERING )?INDEX {index_name}\b", plan)
+
+    def test_active_projects_newest_first(self):
+        qs = Project.objects.filter(is_active=True).order_by("-created_at", "-id")[:10]
+        self.assertUsesIndex(qs, "project_active_created_idx")
+
+    def test_date_window_filter(self):
+        d = timezone.now().date()
+        qs = Project.objects.filter(is_active=True, start_date__lte=d, end_date__gte=d)
+        self.assertUsesIndex(qs, "project_active_window_idx")
+
+    def test_project_donations_newest_first(self):
+        qs = self.project.donations.all()[:10]
+        self.assertUsesIndex(qs, "donation_project_created_idx")
+
+    def test_case_insensitive_email_lookup(self):
+        qs = User.objects.alias(email_lower=Lower("email")).filter(email_lower="owner@example.com")
+        self.assertUsesIndex(qs, "user_email_lower_uniq")
+        self.assertEqual(User.objects.get_by_email("OWNER@Example.com"), self.owner)
+
+
+class ProjectSearchTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.wells = make_project(self.owner, title="Water wells", details="Clean water for villages.")
+        self.school = make_project(self.owner, title="Village school", details="Books and <b>desks</b> for water-side towns.")
+        make_project(self.owner, title="Solar panels", details="Renewable energy.")
+
+    def search(self, q):
+        return self.client.get(reverse("project_list"), {"q": q})
+
+    def test_matches_title_and_details_ranked_by_title(self):
+        response = self.search("water")
+        self.assertEqual(list(response.context["projects"]), [self.wells, self.school])
+
+    def test_prefix_terms_and_highlighted_snippet_is_escaped(self):
+        response = self.search("desk")
+        self.assertEqual(list(response.context["projects"]), [self.school])
+        self.assertContains(response, "&lt;b&gt;<mark>desks</mark>&lt;/b&gt;")
+
+    def test_index_follows_save_and_delete(self):
+        self.wells.title = "Irrigation canals"
+        self.wells.save()
+        self.assertEqual(list(self.search("irrigation").context["projects"]), [self.wells])
+
+        self.wells.delete()
+        self.assertEqual(list(self.search("irrigation").context["projects"]), [])
+
+    def test_search_respects_active_flag_and_ignores_syntax(self):
+        Project.objects.filter(pk=self.wells.pk).update(is_active=False)
+        self.assertEqual(list(self.search('water" *').context["projects"]), [self.school])
+        self.assertEqual(list(self.search("!!!").context["projects"]), [])
+
+    def test_rebuild_command(self):
+        Project.objects.filter(pk=self.school.pk).update(title="Library")  # bypasses signals
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        self.assertEqual(list(self.search("library").context["projects"]), [self.school])
+
+
+class DetailFragmentCacheTests(TestCase):
+    def setUp(self):
+        caches["fragments"].clear()
+        self.owner = make_user()
+        self.project = make_project(self.owner, details="Line one\nLine two")
+        self.url = reverse("project_detail", kwargs={"pk": self.project.pk})
+
+    def get(self):
+        response = self.client.get(self.url)
+        response.render()
+        return response
+
+    def test_warm_fragments_skip_donation_query(self):
+        self.get()
+        with self.assertNumQueries(1):
+            response = self.get()
+        self.assertContains(response, "<p>Line one<br>Line two</p>")
+
+    def test_donation_invalidates_donations_fragment(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("project_donate", kwargs={"pk": self.project.pk}),
+                             {"donor_name": "Mona", "amount": 300})
+        response = self.get()
+        self.assertContains(response, "Mona")
+        self.assertContains(response, "<strong>Total raised:</strong> 300 EGP")
+
+    def test_project_edit_invalidates_details_fragment(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.details = "Rewritten"
+            self.project.save()
+        self.assertContains(self.get(), "Rewritten")
+
+    def test_per_user_parts_are_not_cached(self):
+        self.get()
+        self.client.force_login(self.owner)
+        response = self.get()
+        self.assertContains(response, "You are the owner of this project.")
+        self.assertNotContains(response, "<h4>Donate</h4>")
+
+    def test_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "fragments": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location},
+        }):
+            self.get()
+            self.assertTrue(os.listdir(location))
+            with self.assertNumQueries(1):
+                self.get()
+
+
+class RedisStandIn(socketserver.StreamRequestHandler):
+    """Just enough RESP for Django's RedisCache: strings with expiry, no persistence."""
+
+    resp3 = False
+
+    def null(self):
+        return b"_\r\n" if self.resp3 else b"$-1\r\n"
+
+    def reply(self, value):
+        if value is None:
+            out = self.null()
+        elif isinstance(value, int):
+            out = b":%d\r\n" % value
+        elif isinstance(value, list):
+            out = b"*%d\r\n" % len(value)
+            for item in value:
+                out += self.null() if item is None else b"$%d\r\n%s\r\n" % (len(item), item)
+        elif isinstance(value, bytes):
+            out = b"$%d\r\n%s\r\n" % (len(value), value)
+        else:
+            out = value.encode() + b"\r\n"
+        self.wfile.write(out)
+
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def lookup(self, key):
+        value, deadline = self.server.data.get(key, (None, None))
+        if deadline is not None and deadline <= time.time():
+            self.server.data.pop(key, None)
+            return None
+        return value
+
+    def handle(self):
+        data = self.server.data
+        while (args := self.read_command()) is not None:
+            command, args = args[0].upper(), args[1:]
+            self.server.commands.append(command)
+            if command == b"GET":
+                self.reply(self.lookup(args[0]))
+            elif command == b"MGET":
+                self.reply([self.lookup(key) for key in args])
+            elif command == b"SET":
+                key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+                if b"NX" in options and self.lookup(key) is not None:
+                    self.reply(None)
+                    continue
+                deadline = None
+                if b"EX" in options:
+                    deadline = time.time() + int(options[options.index(b"EX") + 1])
+                elif b"PX" in options:
+                    deadline = time.time() + int(options[options.index(b"PX") + 1]) / 1000
+                data[key] = (value, deadline)
+                self.reply("+OK")
+            elif command == b"DEL":
+                self.reply(sum(data.pop(key, None) is not None for key in args))
+            elif command == b"EXISTS":
+                self.reply(sum(self.lookup(key) is not None for key in args))
+            elif command == b"FLUSHDB":
+                data.clear()
+                self.reply("+OK")
+            elif command == b"HELLO":  # redis-py 6+ asks for RESP3, which only changes nulls here
+                self.resp3 = args[:1] == [b"3"]
+                self.reply("%1\r\n$5\r\nproto\r\n:" + ("3" if self.resp3 else "2"))
+            else:  # PING, SELECT, CLIENT SETINFO, ...
+                self.reply("+OK")
+
+
+class RedisFragmentCacheTests(TestCase):
+    def test_settings_select_redis(self):
+        env = {**os.environ, "CROWDFUND_FRAGMENT_CACHE": "redis", "CROWDFUND_REDIS_URL": "redis://127.0.0.1:6380/2"}
+        script = "from django.conf import settings; print(settings.CACHES['fragments'])"
+        manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+        result = subprocess.run(manage + ["shell", "-c", script], env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], str({
+            "BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://127.0.0.1:6380/2",
+        }))
+
+    @unittest.skipIf(redis is None, "the redis package is not installed")
+    def test_detail_fragments_round_trip_through_redis(self):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), RedisStandIn)
+        server.daemon_threads = True
+        server.data, server.commands = {}, []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        location = "redis://127.0.0.1:%d/1" % server.server_address[1]
+        with override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "fragments": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": location},
+        }):
+            project = make_project(make_user(), details="Line one")
+            url = reverse("project_detail", kwargs={"pk": project.pk})
+            self.client.get(url)
+            self.assertTrue(server.data)
+            with self.assertNumQueries(1):
+                self.client.get(url)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse("project_donate", kwargs={"pk": project.pk}),
+                                 {"donor_name": "Mona", "amount": 300})
+            self.assertIn(b"DEL", server.commands)
+            self.assertContains(self.client.get(url), "Mona")
+
+
+class ImportDonationsTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.project = make_project(self.owner)
+        self.closed = make_project(self.owner, title="Closed", is_active=False)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as fh:
+            fh.write(text)
+        return path
+
+    def test_csv_import_updates_totals_and_reports_rejects(self):
+        path = self.write("batch.csv", "\n".join([
+            "project_id,amount,donor_name,donor_email",
+            f"{self.project.pk},100,Ali,ali@example.com",
+            f"{self.project.pk},250,,",
+            f"{self.project.pk},0,Zero,",
+            f"{self.project.pk},5000000,Huge,",
+            f"{self.project.pk},10,Bad,not-an-email",
+            f"{self.closed.pk},10,Closed,",
+            "999999,10,Missing,",
+        ]))
+        call_command("import_donations", path, chunk_size=2, stdout=io.StringIO())
+
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.raised_amount, self.project.donation_count), (350, 2))
+        self.assertEqual(self.project.donations.count(), 2)
+        self.assertFalse(self.closed.donations.exists())
+
+        with open(path + ".rejects.jsonl") as fh:
+            rejects = [json.loads(line) for line in fh]
+        self.assertEqual([r["line"] for r in rejects], [4, 5, 6, 7, 8])
+        self.assertEqual(rejects[0]["errors"], ["Donation amount must be at least 1 EGP."])
+        self.assertEqual(rejects[1]["errors"], ["Donation amount is too large."])
+
+    def test_jsonl_import(self):
+        path = self.write("batch.jsonl", "\n".join([
+            json.dumps({"project_id": self.project.pk, "amount": 40}),
+            "{not json",
+            json.dumps({"project_id": self.project.pk, "amount": "60", "donor_name": "Sara"}),
+        ]))
+        rejects = os.path.join(self.tmp.name, "rejects.jsonl")
+        call_command("import_donations", path, rejects=rejects, stdout=io.StringIO())
+
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.raised_amount, self.project.donation_count), (100, 2))
+        with open(rejects) as fh:
+            self.assertEqual([json.loads(line)["line"] for line in fh], [2])
+
+    def test_rows_are_not_coerced(self):
+        pk = self.project.pk
+        bad_rows = [
+            ({"project_id": pk, "amount": 10.9}, "Enter a whole number."),
+            ({"project_id": pk, "amount": True}, "Enter a whole number."),
+            ({"project_id": pk, "amount": "10.9"}, "Enter a whole number."),
+            ({"project_id": pk + 0.7, "amount": 10}, "project_id must be an integer."),
+            ({"project_id": True, "amount": 10}, "project_id must be an integer."),
+            ({"project_id": pk, "amount": 10, "donor_name": 123}, "donor_name must be text."),
+            ({"project_id": pk, "amount": 10, "donor_email": ["a@example.com"]}, "donor_email must be text."),
+        ]
+        path = self.write("batch.jsonl", "\n".join(
+            [json.dumps(row) for row, _ in bad_rows] + [json.dumps({"project_id": pk, "amount": 7})]))
+        rejects = os.path.join(self.tmp.name, "rejects.jsonl")
+        call_command("import_donations", path, rejects=rejects, chunk_size=3, stdout=io.StringIO())
+
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.raised_amount, self.project.donation_count), (7, 1))
+        with open(rejects) as fh:
+            self.assertEqual([json.loads(line)["errors"] for line in fh], [[error] for _, error in bad_rows])
+
+
+class DonationExportTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.project = make_project(self.owner)
+        self.url = reverse("project_donations_export", kwargs={"pk": self.project.pk})
+        for day, amount in ((1, 10), (2, 20), (3, 30)):
+            donation = Donation.objects.create(project=self.project, amount=amount, donor_name=f"Day {day}")
+            Donation.objects.filter(pk=donation.pk).update(
+                created_at=timezone.make_aware(datetime.datetime(2026, 1, day, 12))
+            )
+
+    def test_owner_gets_streamed_csv_filtered_by_date(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url, {"since": "2026-01-02", "until": "2026-01-02"})
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,project_id,created_at,amount,donor_name,donor_email,donor_account")
+        self.assertEqual(len(lines), 2)
+        self.assertIn(",20,Day 2,", lines[1])
+
+    def test_csv_cells_cannot_run_as_formulas(self):
+        Donation.objects.update(donor_name="=HYPERLINK(\"https://evil.example\",\"refund\")")
+        Donation.objects.filter(amount=20).update(donor_name="@SUM(A1)", donor_email="-1+1@example.com")
+        self.project.title = "+cmd|' /C calc'!A0"
+        self.project.save()
+        lines = list(csv.reader(
+            "".join(export_donations(Donation.objects.filter(amount__lte=20))).splitlines()))
+        self.assertEqual([row[4] for row in lines[1:]], ["'=HYPERLINK(\"https://evil.example\",\"refund\")", "'@SUM(A1)"])
+        self.assertEqual(lines[2][5], "'-1+1@example.com")
+        self.assertEqual(lines[1][3], "10")  # numbers are left alone
+        [title] = [row[1] for row in csv.reader("".join(export_projects(Project.objects.all())).splitlines()[1:])]
+        self.assertEqual(title, "'+cmd|' /C calc'!A0")
+
+    def test_jsonl_format(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url, {"format": "jsonl"})
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([r["amount"] for r in rows], [10, 20, 30])
+
+    def test_other_users_are_forbidden(self):
+        self.client.force_login(make_user("someone@example.com"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_export_command(self):
+        out = io.StringIO()
+        call_command("export_data", "donations", project=self.project.pk, since=datetime.date(2026, 1, 3), stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_memory_is_independent_of_row_count(self):
+        def peak_for(total):
+            Donation.objects.all().delete()
+            Donation.objects.bulk_create(
+                Donation(project=self.project, amount=1, donor_name="x" * 50) for _ in range(total)
+            )
+            tracemalloc.start()
+            for _ in export_donations(Donation.objects.all(), chunk_size=500):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        small, large = peak_for(2_000), peak_for(20_000)
+        self.assertLess(large, small * 1.5)
+
+
+def reload_urlconf():
+    importlib.reload(import_module("projects.urls"))
+    importlib.reload(import_module("crowdfund_console.urls"))
+    clear_url_caches()
+
+
+@override_settings(CROWDFUND_ASYNC_VIEWS=True)
+class AsyncReadViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # cleanups run LIFO: this reload happens after the settings override is undone
+        cls.addClassCleanup(reload_urlconf)
+        super().setUpClass()
+        reload_urlconf()
+
+    def setUp(self):
+        self.owner = make_user()
+        self.projects = [make_project(self.owner, title=f"Project {i}") for i in range(12)]
+        self.project = self.projects[-1]
+        Donation.objects.create(project=self.project, amount=70, donor=self.owner)
+
+    async def test_project_list(self):
+        self.assertIs(resolve(reverse("project_list")).func, async_views.project_list)
+        response = await self.async_client.get(reverse("project_list"))
+        self.assertEqual(len(response.context["projects"]), 10)
+        self.assertTrue(response.context["is_paginated"])
+
+        response = await self.async_client.get(reverse("project_list"), {"page": 2})
+        self.assertEqual(len(response.context["projects"]), 2)
+        response = await self.async_client.get(reverse("project_list"), {"page": 9})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_project_list_cursor_and_search(self):
+        first = (await self.async_client.get(reverse("project_list"), {"cursor": ""})).context["page_obj"]
+        second = (await self.async_client.get(reverse("project_list"), {"cursor": first.next_cursor})).context
+        self.assertEqual(len(second["projects"]), 2)
+
+        response = await self.async_client.get(reverse("project_list"), {"q": "project 11"})
+        self.assertEqual(list(response.context["projects"]), [self.project])
+
+    async def test_project_detail_for_owner(self):
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get(reverse("project_detail", kwargs={"pk": self.project.pk}))
+        self.assertContains(response, "You are the owner of this project.")
+        self.assertContains(response, "owner@example.com")
+        missing = await self.async_client.get(reverse("project_detail", kwargs={"pk": 999999}))
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_project_donations(self):
+        response = await self.async_client.get(reverse("project_donations", kwargs={"pk": self.project.pk}))
+        self.assertEqual(len(response.context["donations"]), 1)
+
+    async def test_conditional_get(self):
+        url = reverse("project_detail", kwargs={"pk": self.project.pk})
+        await self.async_client.get(url)  # picks up the CSRF cookie
+        etag = (await self.async_client.get(url))["ETag"]
+        response = await self.async_client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BenchmarkSuiteTests(TestCase):
+    def test_seed_and_run_scenarios(self):
+        call_command("seed_data", users=5, projects=20, donations=300, stdout=io.StringIO())
+        self.assertEqual(Donation.objects.count(), 300)
+        self.assertEqual(
+            sum(Project.objects.values_list("raised_amount", flat=True)),
+            sum(Donation.objects.values_list("amount", flat=True)),
+        )
+
+        results = run_benchmarks(InProcessDriver(), iterations=2, warmup=0)
+        self.assertEqual(set(results), set(SCENARIOS))
+        self.assertEqual(results["list"]["queries_per_request"], 2)
+        self.assertEqual(results["login"]["requests"], 2)
+        self.assertFalse([name for name, result in results.items() if "failed" in result])
+
+    def test_logins_rotate_users_and_are_not_throttled(self):
+        call_command("seed_data", users=5, projects=2, donations=0, stdout=io.StringIO())
+        with mock.patch("projects.views.login", wraps=views.login) as logged_in:
+            result = run_benchmarks(InProcessDriver(), ["login"], iterations=40, warmup=0)["login"]
+        self.assertEqual((result["requests"], result.get("failed", 0)), (40, 0))
+        self.assertEqual(len({call.args[1].email for call in logged_in.call_args_list}), 5)
+
+    def test_error_responses_count_as_failures_not_timings(self):
+        result = InProcessDriver().run("GET", "/projects/999999/", None, iterations=3, warmup=0)
+        self.assertEqual((result["requests"], result["failed"]), (0, 3))
+
+    def test_compare_flags_latency_query_and_failure_regressions(self):
+        baseline = {"list": {"p95_ms": 10.0, "queries_per_request": 2}, "detail": {"p95_ms": 5.0}}
+        current = {"list": {"p95_ms": 11.0, "queries_per_request": 3}, "detail": {"p95_ms": 9.0, "failed": 4}}
+        self.assertEqual(compare(baseline, current, threshold=0.2), [
+            "list: queries/request 2 -> 3",
+            "detail: p95 5.0ms -> 9.0ms",
+            "detail: failed requests 0 -> 4",
+        ])
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    CROWDFUND_LOGIN_IP_RATE="100/60",
+    CROWDFUND_LOGIN_EMAIL_RATE="3/60",
+)
+class LoginHardeningTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        auth.throttles.cache_clear()
+
+    def login(self, email="owner@example.com", password="S3cure-pass!"):
+        return self.client.post(reverse("login"), {"email": email, "password": password})
+
+    def test_login_succeeds_case_insensitively(self):
+        response = self.login(email="OWNER@example.com")
+        self.assertRedirects(response, reverse("project_list"), fetch_redirect_response=False)
+
+    def test_unknown_email_costs_one_hash(self):
+        with mock.patch.object(auth.BoundedHasher, "run", autospec=True, return_value=False) as run:
+            response = self.login(email="nobody@example.com")
+        self.assertContains(response, "Invalid email or password.")
+        self.assertEqual(run.call_count, 1)
+
+    def test_wrong_password_costs_one_hash_on_every_login_path(self):
+        from django.contrib.auth import authenticate
+        from django.contrib.auth.backends import ModelBackend
+
+        with mock.patch.object(auth.BoundedHasher, "run", autospec=True, return_value=False) as run, \
+                mock.patch.object(ModelBackend, "authenticate") as model_backend:
+            # the admin login form goes through authenticate() like this
+            self.assertIsNone(authenticate(username="owner@example.com", password="nope"))
+        self.assertEqual(run.call_count, 1)
+        model_backend.assert_not_called()
+
+    def test_permissions_come_from_the_email_backend(self):
+        from django.contrib.auth.models import Permission
+
+        self.assertFalse(self.user.has_perm("projects.view_project"))
+        self.user.user_permissions.add(Permission.objects.get(codename="view_project"))
+        self.assertTrue(User.objects.get(pk=self.user.pk).has_perm("projects.view_project"))
+
+    def test_inactive_account_is_only_revealed_after_password_matches(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertContains(self.login(password="wrong"), "Invalid email or password.")
+        self.assertContains(self.login(), "Account not activated.")
+
+    def test_per_email_rate_limit(self):
+        for _ in range(3):
+            self.assertEqual(self.login(password="wrong").status_code, 200)
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login(email="other@example.com", password="x").status_code, 200)
+
+    @override_settings(CROWDFUND_LOGIN_IP_RATE="2/60", CROWDFUND_LOGIN_EMAIL_RATE="100/60")
+    def test_per_ip_rate_limit_and_backend(self):
+        self.login(email="a@example.com", password="x")
+        self.login(email="b@example.com", password="x")
+        self.assertEqual(self.login().status_code, 429)
+        request = RequestFactory().post("/admin/login/")
+        with self.assertRaises(PermissionDenied):
+            EmailBackend().authenticate(request, username="owner@example.com", password="S3cure-pass!")
+
+    def test_saturated_hasher_sheds_load(self):
+        with mock.patch.object(auth.BoundedHasher, "run", side_effect=auth.HashingBusy):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+
+    def test_bounded_hasher_rejects_when_full(self):
+        hasher = auth.BoundedHasher(workers=1, max_pending=0, wait=0.01)
+        release = threading.Event()
+        pending = threading.Thread(target=hasher.run, args=(release.wait,))
+        pending.start()
+        time.sleep(0.05)
+        with self.assertRaises(auth.HashingBusy):
+            hasher.run(lambda: None)
+        release.set()
+        pending.join()
+        self.assertEqual(hasher.run(lambda: 42), 42)
+
+    def test_token_bucket_refills(self):
+        bucket = auth.TokenBucket(capacity=2, period=10)
+        self.assertEqual([bucket.consume("k", now=0) for _ in range(3)], [True, True, False])
+        self.assertTrue(bucket.consume("k", now=5))
+        self.assertFalse(bucket.consume("k", now=5))
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    CROWDFUND_USER_CACHE_TTL=30,
+)
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        caches["default"].clear()
+        self.user = make_user()
+        self.client.force_login(self.user, backend="projects.backends.EmailBackend")
+        make_project(self.user)
+
+    def test_authenticated_list_needs_no_auth_queries(self):
+        self.client.get(reverse("project_list"))
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get(reverse("project_list"))
+        self.assertContains(response, "owner@example.com")
+
+    def test_saving_user_refreshes_cached_copy(self):
+        self.client.get(reverse("project_list"))
+        self.user.email = "renamed@example.com"
+        self.user.save()
+        self.assertContains(self.client.get(reverse("project_list")), "renamed@example.com")
+
+    def test_deactivation_and_password_change_end_session(self):
+        self.client.get(reverse("project_list"))
+        self.user.is_active = False
+        self.user.save()
+        self.assertNotContains(self.client.get(reverse("project_list")), "owner@example.com")
+
+        self.user.is_active = True
+        self.user.save()
+        self.client.force_login(self.user, backend="projects.backends.EmailBackend")
+        self.client.get(reverse("project_list"))
+        self.user.set_password("N3w-password!")
+        self.user.save()
+        self.assertNotContains(self.client.get(reverse("project_list")), "owner@example.com")
+
+    def test_cached_user_is_a_copy(self):
+        backend = EmailBackend()
+        first = backend.get_user(self.user.pk)
+        first.first_name = "Mutated"
+        self.assertEqual(backend.get_user(self.user.pk).first_name, "Test")
+
+
+class WriteBehindDonationTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.journal_path = os.path.join(tmp.name, "donations.journal")
+        overrides = override_settings(
+            CROWDFUND_DONATION_WRITE_BEHIND=True,
+            CROWDFUND_DONATION_JOURNAL=self.journal_path,
+            CROWDFUND_DONATION_JOURNAL_FSYNC=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.owner = make_user()
+        self.project = make_project(self.owner)
+        self.journal = DonationJournal()
+
+    def donate(self, amount):
+        return self.client.post(reverse("project_donate", kwargs={"pk": self.project.pk}),
+                                {"donor_name": "Nour", "amount": amount})
+
+    def test_donation_is_journaled_then_drained(self):
+        response = self.donate(120)
+        self.assertRedirects(response, reverse("project_detail", kwargs={"pk": self.project.pk}),
+                             fetch_redirect_response=False)
+        self.assertFalse(Donation.objects.exists())
+
+        call_command("drain_donations", once=True, stdout=io.StringIO())
+        donation = Donation.objects.get()
+        self.assertEqual((donation.amount, donation.donor_name), (120, "Nour"))
+        self.assertIsNotNone(donation.journal_id)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.raised_amount, self.project.donation_count), (120, 1))
+        self.assertEqual(os.path.getsize(self.journal_path), 0)  # compacted once drained
+
+    def test_replay_after_crash_is_idempotent(self):
+        self.donate(10)
+        self.donate(20)
+        self.assertEqual(self.journal.drain(), 2)
+        self.journal.write_offset(0)  # crash after commit, before the checkpoint
+        self.donate(30)
+
+        self.assertEqual(self.journal.drain(), 1)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.raised_amount, self.project.donation_count), (60, 3))
+        self.assertEqual(Donation.objects.count(), 3)
+
+    def test_partial_line_waits_for_the_rest(self):
+        self.donate(15)
+        with open(self.journal_path, "ab") as fh:
+            fh.write(b'{"id": "half-writ')
+        self.assertEqual(self.journal.drain(), 1)
+        self.assertEqual(self.journal.drain(), 0)
+        self.assertEqual(self.journal.pending(10), ([], self.journal.read_offset()))
+
+    def test_append_after_a_torn_tail_keeps_the_new_entry(self):
+        self.donate(15)
+        with open(self.journal_path, "ab") as fh:
+            fh.write(b'{"id": "half-writ')  # the writer died mid-line
+        self.donate(25)
+        with self.assertLogs("projects.journal", "ERROR"):
+            self.assertEqual(self.journal.drain(), 2)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.raised_amount, 40)
+
+    def test_crash_during_compaction_loses_nothing(self):
+        self.donate(10)
+        self.assertEqual(self.journal.drain(), 1)
+        with mock.patch.object(DonationJournal, "write_offset", side_effect=OSError("crashed")), \
+                self.assertRaises(OSError):
+            self.journal.compact()
+        self.donate(20)
+        self.assertEqual(self.journal.drain(), 1)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.raised_amount, 30)
+
+    def test_corrupt_lines_are_skipped_once_and_compacted(self):
+        with open(self.journal_path, "wb") as fh:
+            fh.write(b"not json\n")
+        with self.assertLogs("projects.journal", "ERROR") as logs:
+            self.assertEqual(self.journal.drain(), 0)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(os.path.getsize(self.journal_path), 0)
+        self.assertEqual(self.journal.read_offset(), 0)
+        with self.assertNoLogs("projects.journal", "ERROR"):
+            self.assertEqual(self.journal.drain(), 0)
+
+
+class SQLiteProductionProfileTests(SimpleTestCase):
+    def test_retry_on_busy(self):
+        calls = []
+
+        @retry_on_busy(attempts=3, delay=0)
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError("database is locked")
+            return "ok"
+
+        self.assertEqual(flaky(), "ok")
+        self.assertEqual(len(calls), 3)
+
+        @retry_on_busy(attempts=3, delay=0)
+        def broken():
+            calls.append(1)
+            raise OperationalError("no such table: nope")
+
+        with self.assertRaises(OperationalError):
+            broken()
+        self.assertEqual(len(calls), 4)
+
+    def test_concurrent_donations_do_not_hit_lock_errors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_name = os.path.join(tmp, "db.sqlite3")
+            env = {**os.environ, "DJANGO_DB_NAME": db_name, "CROWDFUND_SQLITE_PROFILE": "production"}
+            manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+            for args in (
+                ["migrate"],
+                ["seed_data", "--users", "3", "--projects", "5", "--donations", "0"],
+                # 16 threads, each with its own connection, posting to donate_project
+                ["benchmark", "--scenario", "donate", "--iterations", "400", "--concurrency", "16", "--warmup", "0"],
+            ):
+                result = subprocess.run(manage + args, env=env, capture_output=True, text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+
+            with closing(sqlite3.connect(db_name)) as db:
+                self.assertEqual(db.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+                donations = db.execute("SELECT COUNT(*), SUM(amount) FROM projects_donation").fetchone()
+                totals = db.execute("SELECT SUM(donation_count), SUM(raised_amount) FROM projects_project").fetchone()
+            self.assertEqual(donations, (400, 4000))
+            self.assertEqual(totals, donations)
+
+
+REPLICA_SCRIPT = """
+import json
+from django.test import Client
+from projects.models import User, Project
+from projects.routers import STICKY_COOKIE
+
+owner = User.objects.create_user(email="o@example.com", password="x", first_name="O", mobile_phone="01012345678")
+project = Project.objects.create(owner=owner, title="Primary copy", details="d", target_amount=100,
+                                 start_date="2026-01-01", end_date="2026-12-31")
+# the replica lags behind: it still has the row under its old title
+User.objects.using("replica1").bulk_create([owner])
+Project.objects.using("replica1").bulk_create([Project(
+    pk=project.pk, owner=owner, title="Stale copy", details="d", target_amount=100,
+    start_date="2026-01-01", end_date="2026-12-31")])
+
+client = Client(HTTP_HOST="localhost")
+before = client.get("/").content.decode()
+donated = client.post(f"/projects/{project.pk}/donate/", {"donor_name": "D", "amount": 10})
+after = client.get("/").content.decode()
+print(json.dumps({
+    "before": "Stale copy" in before,
+    "sticky": STICKY_COOKIE in donated.cookies,
+    "after": "Primary copy" in after,
+    "anonymous": "Stale copy" in Client(HTTP_HOST="localhost").get("/").content.decode(),
+    "primary_raised": Project.objects.get(pk=project.pk).raised_amount,
+}))
+"""
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def routed(self, view):
+        middleware = ReadYourWritesMiddleware(lambda request: JsonResponse(view(request), safe=False))
+        return lambda request: json.loads(middleware(request).content)
+
+    def test_router(self):
+        router = PrimaryReplicaRouter()
+        middleware = self.routed(lambda request: [router.db_for_read(Project), router.db_for_write(Project)])
+        factory = RequestFactory()
+        with override_settings(CROWDFUND_DB_REPLICAS={"replica1": 1, "replica2": 0}):
+            self.assertEqual(middleware(factory.get("/")), ["replica1", "default"])
+            self.assertEqual(middleware(factory.post("/")), ["default", "default"])
+            sticky = factory.get("/")
+            sticky.COOKIES[STICKY_COOKIE] = "1"
+            self.assertEqual(middleware(sticky), ["default", "default"])
+            # outside a request (commands, workers) reads stay on the primary
+            self.assertEqual(router.db_for_read(Project), "default")
+        with override_settings(CROWDFUND_DB_REPLICAS={}):
+            self.assertEqual(middleware(factory.get("/")), ["default", "default"])
+
+    def test_pin_to_primary(self):
+        router = PrimaryReplicaRouter()
+
+        def view(request):
+            with pin_to_primary():
+                pinned = router.db_for_read(Project)
+            return [pinned, router.db_for_read(Project)]
+
+        with override_settings(CROWDFUND_DB_REPLICAS={"replica1": 1}):
+            self.assertEqual(self.routed(view)(RequestFactory().get("/")), ["default", "replica1"])
+
+    def test_reads_follow_writes_across_databases(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                "DJANGO_DB_NAME": os.path.join(tmp, "primary.sqlite3"),
+                "DJANGO_REPLICA_DB_NAMES": os.path.join(tmp, "replica.sqlite3"),
+            }
+            manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+            for args in (["migrate"], ["migrate", "--database", "replica1"], ["shell", "-c", REPLICA_SCRIPT]):
+                result = subprocess.run(manage + args, env=env, capture_output=True, text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1]), {
+            "before": True, "sticky": True, "after": True, "anonymous": True, "primary_raised": 10,
+        })
+
+
+class DonationRollupTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.donor = make_user("donor@example.com")
+        self.project = make_project(self.owner)
+        self.url = reverse("project_analytics", kwargs={"pk": self.project.pk})
+
+    def donate(self, day, amount, **kwargs):
+        Donation.objects.create(
+            project=self.project, amount=amount,
+            created_at=timezone.make_aware(datetime.datetime(2026, 1, day, 12)), **kwargs,
+        )
+
+    def rollups(self):
+        return list(DonationDailyRollup.objects.filter(project=self.project).order_by("day").values_list(
+            "day", "amount_sum", "count", "unique_donors"))
+
+    def test_refresh_is_incremental_from_the_high_water_mark(self):
+        self.donate(1, 10, donor=self.donor)
+        self.donate(1, 20, donor=self.donor)
+        self.donate(1, 5, donor_email="Guest@example.com")
+        self.donate(1, 5, donor_email="guest@example.com")
+        self.donate(1, 1, donor_name="Anonymous")
+        self.donate(1, 1, donor_name="Anonymous")
+        self.donate(3, 100)
+        self.assertEqual(refresh_rollups(batch_size=4), 7)
+        self.assertEqual(self.rollups(), [
+            (datetime.date(2026, 1, 1), 42, 6, 4),
+            (datetime.date(2026, 1, 3), 100, 1, 1),
+        ])
+        self.assertEqual(RollupWatermark.objects.get().last_id, Donation.objects.latest("pk").pk)
+
+        self.donate(3, 50, donor=self.donor)
+        # savepoint, watermark, new ids, the one touched bucket, upsert, watermark, release
+        with self.assertNumQueries(7):
+            self.assertEqual(refresh_rollups(), 1)
+        self.assertEqual(self.rollups()[-1], (datetime.date(2026, 1, 3), 150, 2, 2))
+        self.assertEqual(refresh_rollups(), 0)
+
+    def test_rebuild_matches_refresh_and_drops_deleted_donations(self):
+        for day, amount in ((1, 10), (2, 20), (2, 30)):
+            self.donate(day, amount)
+        refresh_rollups()
+        Donation.objects.filter(amount=30).delete()
+        self.assertEqual(rebuild_rollups(chunk_size=1), 2)
+        self.assertEqual([row[:3] for row in self.rollups()], [
+            (datetime.date(2026, 1, 1), 10, 1),
+            (datetime.date(2026, 1, 2), 20, 1),
+        ])
+        self.assertEqual(refresh_rollups(), 0)
+
+    def test_owner_analytics_reads_only_the_rollups(self):
+        for day in (1, 2, 2, 4):
+            self.donate(day, 10)
+        refresh_rollups()
+        self.client.force_login(self.owner)
+        params = {"since": "2025-12-31", "until": "2026-01-04", "format": "json"}
+        response = self.client.get(self.url, params)
+        data = response.json()
+        self.assertEqual(data["totals"], {"amount_sum": 40, "count": 4})
+        self.assertEqual([d["amount_sum"] for d in data["days"]], [0, 10, 20, 0, 10])
+
+        Donation.objects.bulk_create(
+            Donation(project=self.project, amount=1, created_at=timezone.make_aware(datetime.datetime(2026, 1, 3)))
+            for _ in range(500)
+        )
+        refresh_rollups()
+        with self.assertNumQueries(4):  # session, user, project, rollups
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.json()["days"][3]["count"], 500)
+
+        response = self.client.get(self.url, {"since": "2026-01-01", "until": "2026-01-04"})
+        self.assertContains(response, "540 EGP")
+        self.assertEqual([d["percent_of_peak"] for d in response.context["series"]], [2, 4, 100, 2])
+
+    def test_analytics_is_for_the_owner_only(self):
+        self.client.force_login(self.donor)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(self.url, {"since": "2020-01-01", "until": "2026-01-01"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"since": "soon"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        owner = make_user()
+        self.wells = make_project(owner, "Water wells", raised_amount=500, donation_count=2)
+        self.school = make_project(owner, "Village school", raised_amount=900, donation_count=1)
+        self.pumps = make_project(owner, "Water pumps", raised_amount=100, donation_count=7)
+        now = timezone.now()
+        for project, amount, age in (
+            (self.wells, 50, datetime.timedelta(hours=2)),
+            (self.pumps, 10, datetime.timedelta(hours=5)),
+            (self.pumps, 300, datetime.timedelta(days=3)),
+            (self.school, 1000, datetime.timedelta(days=10)),
+        ):
+            Donation.objects.create(project=project, amount=amount, created_at=now - age)
+
+    def titles(self, **params):
+        response = self.client.get(reverse("project_list"), params)
+        return [p.title for p in response.context["projects"]]
+
+    def test_leaderboards_use_the_running_totals(self):
+        self.assertEqual(self.titles(order="funded"), ["Village school", "Water wells", "Water pumps"])
+        self.assertEqual(self.titles(order="donations"), ["Water pumps", "Water wells", "Village school"])
+        self.assertEqual(self.titles(order="donations", q="water"), ["Water pumps", "Water wells"])
+        self.assertEqual(self.titles(order="donors"), self.titles(order="donations"))
+        self.assertEqual(self.titles(order="funded", date=str(timezone.localdate())),
+                         ["Village school", "Water wells", "Water pumps"])
+        self.assertEqual(self.titles(order="bogus"), ["Water pumps", "Village school", "Water wells"])
+
+    def test_trending_reads_the_refreshed_windows(self):
+        self.assertEqual(self.titles(order="trending"), [])
+        self.assertEqual(refresh_trending(), 2)
+        self.assertEqual(self.titles(order="trending"), ["Water wells", "Water pumps"])
+        self.assertEqual(self.titles(order="trending_week"), ["Water pumps", "Water wells"])
+        self.assertEqual(self.titles(order="trending", q="pumps"), ["Water pumps"])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("project_list"), {"order": "trending"})
+        self.assertFalse(response.context["cursor_mode"])
+
+    def test_refresh_replaces_stale_rows(self):
+        refresh_trending()
+        later = timezone.now() + datetime.timedelta(days=2)
+        with self.assertNumQueries(5):  # aggregate, savepoint, delete, insert, release
+            self.assertEqual(refresh_trending(now=later), 2)
+        self.assertEqual(self.titles(order="trending"), [])
+        self.assertEqual(self.titles(order="trending_week"), ["Water pumps", "Water wells"])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.project = make_project(self.owner)
+        self.detail = reverse("project_detail", kwargs={"pk": self.project.pk})
+        self.list = reverse("project_list")
+
+    def revalidate(self, url, response):
+        return self.client.get(url, headers={"if-none-match": response["ETag"]})
+
+    def test_detail_304_costs_one_query(self):
+        first = self.client.get(self.detail)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("Last-Modified", first)
+        # the first response sets the CSRF cookie, so it must stay out of shared caches
+        self.assertIn("csrftoken", first.cookies)
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+
+        etag = self.client.get(self.detail)["ETag"]  # now sent with the CSRF cookie
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_new_donation_or_edit_changes_the_etag(self):
+        etag = self.client.get(self.detail)["ETag"]
+        self.client.post(reverse("project_donate", kwargs={"pk": self.project.pk}), {"amount": 5})
+        self.client.get(self.detail)  # shows and clears the thank-you message
+        response = self.client.get(self.detail, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Total raised:</strong> 5 EGP")
+
+        etag = response["ETag"]
+        Project.objects.filter(pk=self.project.pk).update(updated_at=timezone.now() + datetime.timedelta(seconds=1))
+        self.assertEqual(self.client.get(self.detail, headers={"if-none-match": etag}).status_code, 200)
+
+    def test_list_is_public_for_anonymous_and_revalidates(self):
+        first = self.client.get(self.list)
+        self.assertEqual(first["Cache-Control"], "public, max-age=60")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.revalidate(self.list, first).status_code, 304)
+        response = self.client.get(self.list, headers={"if-modified-since": first["Last-Modified"]})
+        self.assertEqual(response.status_code, 304)
+
+        self.project.add_donation_totals(10)
+        self.assertEqual(self.revalidate(self.list, first).status_code, 200)
+
+    def test_every_list_write_changes_the_list_etag(self):
+        writes = {
+            "project save": lambda: self.project.save(),
+            "new project": lambda: make_project(self.owner, "Village school"),
+            "donation totals": lambda: record_donations([Donation(project=self.project, amount=5)]),
+            "trending refresh": refresh_trending,
+            "project delete": lambda: self.project.delete(),
+        }
+        for name, write in writes.items():
+            with self.subTest(name):
+                first = self.client.get(self.list)
+                self.assertEqual(self.revalidate(self.list, first).status_code, 304)
+                write()
+                self.assertEqual(self.revalidate(self.list, first).status_code, 200)
+
+    def test_evicted_list_version_starts_a_new_one(self):
+        first = self.client.get(self.list)
+        caches["fragments"].delete(LIST_VERSION_KEY)
+        self.assertEqual(self.revalidate(self.list, first).status_code, 200)
+
+    def test_list_version_expires_when_a_bump_is_missed(self):
+        first = self.client.get(self.list)
+        with mock.patch("time.time", return_value=time.time() + settings.CROWDFUND_LIST_VERSION_TTL + 1):
+            self.assertEqual(self.revalidate(self.list, first).status_code, 200)
+
+    def test_process_local_fragment_cache_is_flagged(self):
+        self.assertEqual([w.id for w in check_fragment_cache_is_shared()], ["projects.W001"])
+        file_cache = {**settings.CACHES, "fragments": settings.FRAGMENT_CACHE_BACKENDS["file"]}
+        with override_settings(CACHES=file_cache):
+            self.assertEqual(check_fragment_cache_is_shared(), [])
+        with override_settings(DEBUG=False), self.assertLogs("projects.checks", "WARNING"):
+            warn_unshared_caches()
+
+    def test_signed_in_pages_are_private_and_per_visitor(self):
+        anonymous = self.client.get(self.detail)
+        self.client.force_login(self.owner)
+        response = self.client.get(self.detail)
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        self.assertNotEqual(response["ETag"], anonymous["ETag"])
+        with self.assertNumQueries(1):  # no session or user lookup
+            self.assertEqual(self.revalidate(self.detail, response).status_code, 304)
+
+    def test_missing_project_is_still_404(self):
+        response = self.client.get(reverse("project_detail", kwargs={"pk": 999999}))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response)
+
+
+PROFILE_SCRIPT = """
+import json
+from django.template import engines
+engine = engines["django"].engine
+print(json.dumps({
+    "loaders": [loader.__module__ for loader in engine.template_loaders],
+    "debug": engine.debug,
+    "processors": engine.context_processors,
+}))
+"""
+
+
+class TemplateProfileTests(TestCase):
+    def test_render_time_is_recorded_per_template(self):
+        render_stats(reset=True)
+        self.client.get(reverse("project_list"))
+        self.client.get(reverse("project_list"))
+        stats = render_stats()
+        self.assertEqual(stats["projects/project_list.html"]["count"], 2)
+        self.assertGreater(stats["projects/project_list.html"]["max_ms"], 0)
+        self.assertNotIn("base.html", stats)  # extended templates count towards the page
+
+    @override_settings(CROWDFUND_SLOW_RENDER_MS=0)
+    def test_slow_renders_are_logged(self):
+        with self.assertLogs("projects.templating", "WARNING") as logs:
+            self.client.get(reverse("login"))
+        self.assertIn("login.html", logs.output[0])
+
+    def test_context_processors_only_touch_what_the_template_uses(self):
+        def unexpected():
+            raise AssertionError("evaluated")
+
+        request = RequestFactory().get("/")
+        request.user = SimpleLazyObject(unexpected)
+        request._messages = mock.MagicMock(__len__=unexpected, __iter__=unexpected)
+        engine = engines["django"]
+        with self.assertNumQueries(0):
+            self.assertEqual(engine.from_string("plain").render({}, request), "plain")
+        with self.assertRaises(AssertionError):
+            engine.from_string("{% if user.is_authenticated %}hi{% endif %}").render({}, request)
+
+    def test_warm_templates_compiles_every_template(self):
+        count, errors = warm_templates()
+        self.assertEqual(errors, [])
+        self.assertEqual(count, sum(1 for path in (settings.BASE_DIR / "templates").rglob("*") if path.is_file()))
+
+    def test_production_profile(self):
+        env = {**os.environ, "DJANGO_DEBUG": "False"}
+        env.pop("CROWDFUND_TEMPLATE_PROFILE", None)
+        manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+        result = subprocess.run(manage + ["shell", "-c", PROFILE_SCRIPT], env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        profile = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(profile["loaders"], ["django.template.loaders.cached"])
+        self.assertFalse(profile["debug"])
+        self.assertNotIn("django.template.context_processors.debug", profile["processors"])
+
+        result = subprocess.run(manage + ["warm_templates"], env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.owner = make_user()
+        self.project = make_project(self.owner)
+        self.detail = reverse("project_detail", kwargs={"pk": self.project.pk})
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 3, 9):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.cumulative()), [(1, 2), (5, 3), ("+Inf", 4)])
+        self.assertEqual((histogram.sum, histogram.count), (13, 4))
+
+    def test_records_queries_db_and_template_time_per_view(self):
+        self.client.get(self.detail)
+        self.client.get(self.detail)
+        queries = registry.histograms["crowdfund_request_queries", "project_detail"]
+        self.assertEqual(queries.count, 2)
+        self.assertEqual(queries.sum, 3)  # the second render reuses the cached donations fragment
+        self.assertGreater(registry.histograms["crowdfund_request_db_seconds", "project_detail"].sum, 0)
+        self.assertGreater(registry.histograms["crowdfund_request_template_seconds", "project_detail"].sum, 0)
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        text = response.content.decode()
+        self.assertIn('crowdfund_request_queries_bucket{view="project_detail",le="1"} 1', text)
+        self.assertIn('crowdfund_request_queries_bucket{view="project_detail",le="2"} 2', text)
+        self.assertIn('crowdfund_request_duration_seconds_count{view="project_detail"} 2', text)
+        self.assertIn('crowdfund_requests_total{view="project_detail",status="200"} 2', text)
+        self.assertIn('crowdfund_template_renders_total{template="projects/project_detail.html"}', text)
+
+    def test_metrics_are_private(self):
+        self.assertEqual(self.client.get(reverse("metrics"), REMOTE_ADDR="203.0.113.9").status_code, 404)
+
+    def test_query_budget_logs_or_raises(self):
+        with override_settings(CROWDFUND_QUERY_BUDGETS={"project_detail": 0}, CROWDFUND_QUERY_BUDGET_ACTION="log"):
+            with self.assertLogs("projects.metrics", "WARNING") as logs:
+                self.client.get(self.detail)
+            self.assertIn("project_detail ran 2 queries, over its budget of 0", logs.output[0])
+            with override_settings(CROWDFUND_QUERY_BUDGET_ACTION="raise"), self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.detail)
+
+    @override_settings(CROWDFUND_QUERY_BUDGET_ACTION="raise")
+    def test_pages_stay_within_budget_as_data_grows(self):
+        donor = make_user("donor@example.com")
+        for i in range(15):
+            project = make_project(self.owner, title=f"Project {i}")
+            Donation.objects.create(project=project, amount=5, donor=donor)
+        for _ in range(15):
+            Donation.objects.create(project=self.project, amount=5, donor=donor)
+        self.client.force_login(self.owner)
+        for url in (
+            reverse("project_list"),
+            reverse("project_list") + "?order=funded&q=project",
+            self.detail,
+            reverse("project_donations", kwargs={"pk": self.project.pk}),
+            reverse("project_analytics", kwargs={"pk": self.project.pk}),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(reverse("project_donations_export", kwargs={"pk": self.project.pk}))
+        b"".join(response.streaming_content)
+
+
+class ScalableAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="x")
+        self.client.force_login(self.admin)
+        self.owner = make_user("Alice.Owner@example.com")
+        self.project = make_project(self.owner, details="Solar panels for village schools.")
+        self.other = make_project(make_user("bob@example.com"), title="Bakery")
+        self.donations = reverse("admin:projects_donation_changelist")
+        self.projects = reverse("admin:projects_project_changelist")
+
+    def donate(self, amount=10, when=None, **kwargs):
+        kwargs.setdefault("project", self.project)
+        donation = Donation.objects.create(amount=amount, created_at=when or timezone.now(), **kwargs)
+        donation.project.add_donation_totals(amount)
+        return donation
+
+    def changelist_sql(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q["sql"] for q in ctx.captured_queries]
+
+    def test_changelists_cost_the_same_for_any_number_of_rows(self):
+        self.donate(donor=self.owner)
+        self.client.get(self.donations)  # fills the request-user cache
+        _, few = self.changelist_sql(self.donations)
+        for _ in range(30):
+            self.donate(donor=self.owner)
+            self.donate(project=self.other)
+        _, many = self.changelist_sql(self.donations)
+        self.assertEqual(len(few), len(many), "\n".join(many))
+        self.assertFalse(any("DISTINCT" in sql for sql in many))
+
+    @override_settings(CROWDFUND_ADMIN_COUNT_LIMIT=5)
+    def test_large_tables_show_an_estimate_instead_of_counting(self):
+        for _ in range(8):
+            self.donate()
+        response, queries = self.changelist_sql(self.donations)
+        self.assertFalse(any("COUNT(" in sql for sql in queries))
+        self.assertEqual(response.context["cl"].result_count, Donation.objects.order_by("-pk")[0].pk)
+        # filtered lists are counted, but only up to the limit
+        response, queries = self.changelist_sql(self.donations + "?project__id__exact=%d" % self.project.pk)
+        self.assertEqual(response.context["cl"].result_count, 5)
+
+    def test_project_search_uses_the_search_index_ids_and_owner_email(self):
+        for term, expected in (
+            ("solar", [self.project]),
+            ("vill", [self.project]),
+            (str(self.other.pk), [self.other]),
+            ("alice.owner@ex", [self.project]),
+            ("BOB@", [self.other]),
+        ):
+            with self.subTest(term=term):
+                response = self.client.get(self.projects, {"q": term})
+                self.assertEqual(list(response.context["cl"].result_list), expected)
+
+    def test_donation_search_matches_guest_and_account_emails_by_prefix(self):
+        guest = self.donate(donor_email="Carol@Example.com")
+        account = self.donate(donor=self.owner)
+        self.donate(donor_email="dave@example.com")
+        response = self.client.get(self.donations, {"q": "carol"})
+        self.assertEqual(list(response.context["cl"].result_list), [guest])
+        response = self.client.get(self.donations, {"q": "ALICE"})
+        self.assertEqual(list(response.context["cl"].result_list), [account])
+
+    def test_date_hierarchy_offers_the_periods_between_first_and_last(self):
+        self.donate(when=timezone.make_aware(datetime.datetime(2024, 11, 3, 12)))
+        self.donate(when=timezone.make_aware(datetime.datetime(2026, 2, 9, 12)))
+        response = self.client.get(self.donations)
+        self.assertContains(response, "created_at__year=2025")
+        response = self.client.get(self.donations, {"created_at__year": 2024})
+        self.assertContains(response, "created_at__month=11")
+        self.assertNotContains(response, "created_at__month=10")
+        response = self.client.get(self.donations, {"created_at__year": 2026, "created_at__month": 2})
+        self.assertContains(response, "created_at__day=9")
+        self.assertEqual(len(response.context["cl"].result_list), 1)
+
+    def test_deactivate_action_is_one_update(self):
+        before = Project.objects.get(pk=self.project.pk).updated_at
+        data = {"action": "deactivate_projects", "_selected_action": [self.project.pk, self.other.pk]}
+        # session, user, the changelist's row estimate and count, and the UPDATE
+        with self.assertNumQueries(6):
+            response = self.client.post(self.projects, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Project.objects.filter(is_active=True).exists())
+        self.assertGreater(Project.objects.get(pk=self.project.pk).updated_at, before)
+
+    def test_export_actions_stream_the_selection(self):
+        first = self.donate(amount=7)
+        self.donate(amount=9, project=self.other)
+        response = self.client.post(self.donations, {"action": "export_donations_csv", "_selected_action": [first.pk]})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f"{first.pk},{self.project.pk},"))
+
+        response = self.client.post(self.projects, {"action": "export_projects_csv", "_selected_action": [self.other.pk]})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([line.split(",")[1] for line in lines], ["title", "Bakery"])
+
+    def test_admin_donation_changes_keep_the_running_totals(self):
+        self.client.post(reverse("admin:projects_donation_add"), {
+            "project": self.project.pk, "amount": 40, "donor_name": "Walk-in", "donor_email": "",
+        })
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.raised_amount, self.project.donation_count), (40, 1))
+
+        gone = self.donate(amount=25)
+        self.donate(amount=5)
+        self.client.post(self.donations, {"action": "delete_selected", "_selected_action": [gone.pk], "post": "yes"})
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.raised_amount, self.project.donation_count), (45, 2))
+
+
+class OwnerDashboardTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.client.force_login(self.owner)
+
+    def add_projects(self, owner, count):
+        today = timezone.localdate()
+        Project.objects.bulk_create([
+            Project(owner=owner, title=f"Project {i}", details="d", target_amount=100,
+                    start_date=today, end_date=today + datetime.timedelta(days=10))
+            for i in range(count)
+        ])
+
+    def dashboard_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("my_projects"))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_stats_per_project(self):
+        project = make_project(self.owner, end_date=timezone.localdate() + datetime.timedelta(days=5))
+        make_project(make_user("other@example.com"), title="Not mine")
+        when = timezone.now() - datetime.timedelta(hours=2)
+        Donation.objects.create(project=project, amount=30, created_at=when - datetime.timedelta(days=1))
+        Donation.objects.create(project=project, amount=20, created_at=when)
+        project.add_donation_totals(50, 2)
+
+        response = self.client.get(reverse("my_projects"))
+        [row] = response.context["projects"]
+        self.assertEqual(row.last_donation_at, when)
+        self.assertEqual((row.raised_amount, row.donation_count, row.days_remaining), (50, 2, 5))
+        self.assertEqual(response.context["summary"], {"projects": 1, "raised": 50, "donations": 2})
+        self.assertContains(response, "2 donations", count=2)  # the summary and the row
+        self.assertNotContains(response, "Not mine")
+
+    def test_constant_queries_for_one_or_a_thousand_projects(self):
+        self.add_projects(self.owner, 1)
+        self.client.get(reverse("my_projects"))  # fills the request-user cache
+        one = self.dashboard_queries()
+
+        big = make_user("big@example.com")
+        self.add_projects(big, 1000)
+        Donation.objects.bulk_create([Donation(project=p, amount=1) for p in big.projects.all()[:200]])
+        self.client.force_login(big)
+        self.client.get(reverse("my_projects"))
+        self.assertEqual(self.dashboard_queries(), one)
+
+        response = self.client.get(reverse("my_projects"))
+        self.assertEqual(len(response.context["projects"]), 25)
+        self.assertEqual(response.context["summary"]["projects"], 1000)
+        response = self.client.get(reverse("my_projects"), {"cursor": response.context["page_obj"].next_cursor})
+        self.assertEqual(len(response.context["projects"]), 25)
+        self.assertEqual(self.client.get(reverse("my_projects"), {"cursor": "junk"}).status_code, 404)
+
+
+class SMTPStandIn(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib; refuses recipients containing "bounce"."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stand-in")
+        in_data = False
+        for line in self.rfile:
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    self.server.messages += 1
+                    self.reply("250 queued")
+                continue
+            command = line[:4].upper()
+            if command == b"DATA":
+                in_data = True
+                self.reply("354 go ahead")
+            elif command == b"QUIT":
+                self.reply("221 bye")
+                return
+            elif command == b"RCPT" and b"bounce" in line:
+                self.reply("550 no such user")
+            else:
+                self.reply("250 ok")
+
+
+class OutboxMailTests(TestCase):
+    def setUp(self):
+        self.owner = make_user()
+        self.project = make_project(self.owner)
+
+    def register(self, email="new@example.com"):
+        return self.client.post(reverse("register"), {
+            "first_name": "New", "last_name": "User", "email": email, "mobile_phone": "01012345678",
+            "password1": "An0ther-secret!", "password2": "An0ther-secret!",
+        })
+
+    def smtp_server(self):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPStandIn)
+        server.daemon_threads = True
+        server.connections = server.messages = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_registration_queues_activation_instead_of_sending(self):
+        self.assertRedirects(self.register(), reverse("login"), fetch_redirect_response=False)
+        user = User.objects.get(email="new@example.com")
+        self.assertFalse(user.is_active)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboxEmail.objects.get().dedup_key, f"activation:{user.pk}")
+
+        call_command("send_outbox", stdout=io.StringIO())
+        [message] = mail.outbox
+        self.assertEqual(message.to, ["new@example.com"])
+        self.assertIn("Hi New,", message.body)
+        link = message.body.split("example.com", 1)[1].split()[0]
+        self.assertRedirects(self.client.get(link), reverse("project_list"), fetch_redirect_response=False)
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.SENT)
+
+    def test_html_bodies_escape_what_users_typed(self):
+        user = make_user("mallory@example.com")
+        user.first_name = '<a href="https://evil.example">Claim your prize</a>'
+        queue_activation(user)
+        email = OutboxEmail.objects.get()
+        self.assertNotIn("<a href=\"https://evil", email.html_body)
+        self.assertIn("&lt;a href=&quot;https://evil.example&quot;&gt;", email.html_body)
+        self.assertIn(f'/activate/{urlsafe_base64_encode(force_bytes(user.pk))}/', email.html_body)
+        self.assertIn(user.first_name, email.body)  # the plain-text part is not HTML
+
+    def receipt_for(self, address):
+        donor = User.objects.filter(email=address).first() or make_user(address)
+        queue_receipts([Donation.objects.create(project=self.project, amount=1, donor=donor)])
+
+    def test_donation_receipts_are_queued_once(self):
+        url = reverse("project_donate", kwargs={"pk": self.project.pk})
+        self.client.force_login(make_user("nour@example.com"))
+        # the receipt goes to the verified account, not to whatever was typed
+        self.client.post(url, {"donor_name": "Nour", "donor_email": "someone-else@example.com", "amount": 25})
+        donation = Donation.objects.get(amount=25)
+        receipt = OutboxEmail.objects.get()
+        self.assertEqual((receipt.kind, receipt.to), (OutboxEmail.RECEIPT, "nour@example.com"))
+        self.assertIn("25 EGP to Water wells", receipt.body)
+
+        queue_receipts([donation])  # e.g. a replayed journal entry
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_guest_donations_do_not_relay_mail(self):
+        url = reverse("project_donate", kwargs={"pk": self.project.pk})
+        for i in range(3):
+            self.client.post(url, {"donor_name": "Guest", "donor_email": f"victim{i}@example.com", "amount": 5})
+        self.assertEqual(Donation.objects.filter(donor_email__startswith="victim").count(), 3)
+        inactive = make_user("inactive@example.com")
+        User.objects.filter(pk=inactive.pk).update(is_active=False)
+        queue_receipts([Donation.objects.create(project=self.project, amount=1, donor_id=inactive.pk)])
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_batch_shares_one_smtp_connection(self):
+        server = self.smtp_server()
+        for i in range(5):
+            self.receipt_for(f"d{i}@example.com")
+        with override_settings(EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+                               EMAIL_HOST="127.0.0.1", EMAIL_PORT=server.server_address[1], EMAIL_USE_TLS=False):
+            self.assertEqual(send_outbox(), (5, 0))
+            self.assertEqual(send_outbox(), (0, 0))
+        self.assertEqual((server.connections, server.messages), (1, 5))
+
+    def test_failures_back_off_then_give_up(self):
+        server = self.smtp_server()
+        for address in ("ok@example.com", "bounce@example.com", "fine@example.com"):
+            self.receipt_for(address)
+        smtp = override_settings(EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend", EMAIL_HOST="127.0.0.1",
+                                 EMAIL_PORT=server.server_address[1], EMAIL_USE_TLS=False,
+                                 CROWDFUND_MAIL_MAX_ATTEMPTS=2)
+        with smtp, self.assertLogs("projects.mail", "WARNING"):
+            self.assertEqual(send_outbox(), (2, 1))
+        # the refused message cost a reconnect; the rest of the batch went on
+        self.assertEqual((server.connections, server.messages), (2, 2))
+        bounced = OutboxEmail.objects.get(to="bounce@example.com")
+        self.assertEqual((bounced.status, bounced.attempts), (OutboxEmail.PENDING, 1))
+        self.assertIn("SMTPRecipientsRefused", bounced.last_error)
+        self.assertGreater(bounced.next_attempt_at, timezone.now())
+
+        with smtp, self.assertLogs("projects.mail", "WARNING"):
+            self.assertEqual(send_outbox(), (0, 0))  # not due yet
+            OutboxEmail.objects.filter(pk=bounced.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(send_outbox(), (0, 1))
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), (OutboxEmail.FAILED, 2))
+
+    def test_unreachable_server_leaves_the_batch_for_later(self):
+        self.receipt_for("x@example.com")
+        with override_settings(EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+                               EMAIL_HOST="127.0.0.1", EMAIL_PORT=1, EMAIL_TIMEOUT=1), \
+                self.assertLogs("projects.mail", "WARNING"):
+            self.assertEqual(send_outbox(), (0, 1))
+        row = OutboxEmail.objects.get()
+        self.assertEqual((row.status, row.attempts), (OutboxEmail.PENDING, 1))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class RegistrationTests(TestCase):
+    def register(self, email="new@example.com", password="An0ther-secret!"):
+        return self.client.post(reverse("register"), {
+            "first_name": "New", "last_name": "User", "email": email, "mobile_phone": "01012345678",
+            "password1": password, "password2": password,
+        })
+
+    def test_relies_on_the_unique_constraint_instead_of_a_pre_check(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.register().status_code, 302)
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith('SELECT') and "projects_user" in q["sql"]])
+
+        response = self.register(email="NEW@Example.com")
+        self.assertContains(response, "This email is already registered.")
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_emails_are_unique_whatever_their_case(self):
+        from django.db import IntegrityError
+
+        make_user("Owner@example.com")
+        with self.assertRaises(IntegrityError):
+            make_user("owner@EXAMPLE.com")
+
+    def test_password_is_hashed_on_the_bounded_executor(self):
+        with mock.patch.object(auth.BoundedHasher, "run", autospec=True, side_effect=lambda self, fn, *a: fn(*a)) as run:
+            self.register()
+        self.assertEqual(run.call_count, 1)
+        self.assertTrue(User.objects.get().check_password("An0ther-secret!"))
+
+        with mock.patch.object(auth.BoundedHasher, "run", side_effect=auth.HashingBusy):
+            response = self.register(email="later@example.com")
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(User.objects.filter(email="later@example.com").exists())
+
+    def test_validators_are_built_once(self):
+        validators = auth.warm_password_validators()
+        self.assertIs(auth.warm_password_validators(), validators)
+        self.assertContains(self.register(password="password123"), "This password is too common.")
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = os.path.join(tmp.name, "root")
+        assets = os.path.join(tmp.name, "assets")
+        os.makedirs(os.path.join(assets, "css"))
+        with open(os.path.join(assets, "css", "app.css"), "w") as fh:
+            fh.writelines(f".col-{i} {{ width: {i}%; }}\n" for i in range(100))
+        overrides = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[*settings.STATICFILES_DIRS, assets],
+            STORAGES={**settings.STORAGES, "staticfiles": {
+                "BACKEND": "projects.staticfiles.CompressedManifestStaticFilesStorage"}},
+            CROWDFUND_SERVE_STATIC=True,
+            CROWDFUND_STATIC_MAX_AGE=300,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        with open(os.path.join(self.root, "staticfiles.json")) as fh:
+            self.css = "/static/" + json.load(fh)["paths"]["css/app.css"]
+        self.middleware = StaticFilesMiddleware(lambda request: HttpResponse("app", status=404))
+        self.factory = RequestFactory()
+
+    def get(self, path, method="get", **headers):
+        return self.middleware(getattr(self.factory, method)(path, headers=headers))
+
+    def test_collectstatic_writes_hashed_and_gzipped_copies(self):
+        self.assertRegex(self.css, r"^/static/css/app\.[0-9a-f]{12}\.css$")
+        hashed = os.path.join(self.root, self.css.removeprefix("/static/"))
+        self.assertTrue(os.path.exists(hashed + ".gz"))
+        # too small to gain from compression
+        self.assertTrue(os.path.exists(os.path.join(self.root, "img", "favicon.svg")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "img", "favicon.svg.gz")))
+
+    def test_serves_the_smallest_accepted_encoding(self):
+        plain = self.get(self.css)
+        self.assertEqual(plain.status_code, 200)
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertEqual(plain["Vary"], "Accept-Encoding")
+        self.assertTrue(plain["Content-Type"].startswith("text/css"))
+
+        gzipped = self.get(self.css, Accept_Encoding="br;q=0, gzip, deflate")
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertLess(int(gzipped["Content-Length"]), int(plain["Content-Length"]))
+        self.assertEqual(len(gzipped.content), int(gzipped["Content-Length"]))
+        self.assertEqual(self.get(self.css, Accept_Encoding="gzip;q=0")["Content-Length"], plain["Content-Length"])
+
+    def test_cache_headers_and_revalidation(self):
+        response = self.get(self.css, Accept_Encoding="gzip")
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        unhashed = self.get("/static/css/app.css")
+        self.assertEqual(unhashed["Cache-Control"], "public, max-age=300")
+
+        not_modified = self.get(self.css, Accept_Encoding="gzip", If_None_Match=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        # the identity copy has its own ETag
+        self.assertEqual(self.get(self.css, If_None_Match=response["ETag"]).status_code, 200)
+
+        head = self.get(self.css, method="head")
+        self.assertEqual((head.status_code, head.content), (200, b""))
+        self.assertEqual(head["Content-Length"], unhashed["Content-Length"])
+
+    def test_other_requests_reach_the_app(self):
+        for response in (self.get("/static/css/missing.css"), self.get("/projects/"),
+                         self.get(self.css, method="post")):
+            self.assertEqual(response.content, b"app")
+
+    def test_off_unless_enabled(self):
+        with override_settings(CROWDFUND_SERVE_STATIC=False), self.assertRaises(MiddlewareNotUsed):
+            StaticFilesMiddleware(lambda request: None)
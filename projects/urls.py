@@ -1,12 +1,23 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
-from . import views
+from . import async_views, views
+
+if settings.CROWDFUND_ASYNC_VIEWS:
+    detail_view = async_views.project_detail
+    donations_view = async_views.project_donations
+else:
+    detail_view = views.ProjectDetailView.as_view()
+    donations_view = views.project_donations
 
 urlpatterns = [
     path("mine/", views.my_projects, name="my_projects"),
     path("create/", views.ProjectCreateView.as_view(), name="project_create"),
-    path("<int:pk>/", views.ProjectDetailView.as_view(), name="project_detail"),
+    path("<int:pk>/", detail_view, name="project_detail"),
     path("<int:pk>/donate/", views.donate_project, name="project_donate"),
+    path("<int:pk>/donations/", donations_view, name="project_donations"),
+    path("<int:pk>/donations/export/", views.export_project_donations, name="project_donations_export"),
+    path("<int:pk>/analytics/", views.project_analytics, name="project_analytics"),
     path("<int:pk>/edit/", views.ProjectUpdateView.as_view(), name="project_edit"),
     path("<int:pk>/delete/", views.ProjectDeleteView.as_view(), name="project_delete"),
 ]
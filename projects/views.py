@@ -1,4 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.core.exceptions import PermissionDenied
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -9,12 +11,25 @@ from django.template.loader import render_to_string
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
 import datetime
 from django.utils import timezone
 
-from .models import User, Project, Donation
+from .auth import HashingBusy, login_allowed, verify_credentials
+from .conditional import conditional_page, project_detail_validators, project_list_validators
+from .db import retry_on_busy
+from .journal import DonationJournal
+from .mail import queue_activation, queue_receipts
+from .metrics import prometheus_text
+from .models import User, Project, Donation, RollupWatermark
 from .forms import RegistrationForm, ProjectForm, DonationForm
+from .pagination import CursorPaginator, InvalidCursor
+from .rollups import WATERMARK as ROLLUP_WATERMARK, daily_series
+from .search import get_search_backend
+from .exports import WRITERS, export_donations
 from crowdfund_console.tokens import account_activation_token
 
 
@@ -22,12 +37,26 @@ def register(request):
     if request.method == "POST":
         form = RegistrationForm(request.POST)
         if form.is_valid():
-            user = form.save(commit=False)
-            user.is_active = True  
-            user.save()
-
-            messages.success(request, "Registration successful! You can now log in.")
-            return redirect("login")
+            try:
+                # hashes on the bounded executor, before the transaction opens
+                user = form.save(commit=False)
+            except HashingBusy:
+                messages.error(request, "We are experiencing heavy load. Please try again shortly.")
+                response = render(request, "registration/register.html", {"form": form}, status=503)
+                response["Retry-After"] = "5"
+                return response
+            user.is_active = False
+            try:
+                with transaction.atomic():
+                    user.save()
+                    # sent by `manage.py send_outbox`, not while the visitor waits
+                    queue_activation(user, request)
+            except IntegrityError:
+                # user_email_lower_uniq; there is no racy exists() pre-check
+                form.add_error("email", "This email is already registered.")
+            else:
+                messages.success(request, "Registration successful! Check your email for the activation link.")
+                return redirect("login")
     else:
         form = RegistrationForm()
 
@@ -44,7 +73,7 @@ def activate(request, uidb64, token):
     if user is not None and account_activation_token.check_token(user, token):
         user.is_active = True
         user.save()
-        login(request, user)
+        login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
         messages.success(request, "Your account has been activated!")
         return redirect("project_list")
     else:
@@ -60,21 +89,27 @@ def login_view(request):
             messages.error(request, "Please provide email and password.")
             return render(request, "login.html")
 
+        if not login_allowed(request, email):
+            messages.error(request, "Too many login attempts. Please wait a minute and try again.")
+            return render(request, "login.html", status=429)
+
         try:
-            user = User.objects.get(email__iexact=email)
-        except User.DoesNotExist:
+            user = verify_credentials(email, password)
+        except HashingBusy:
+            messages.error(request, "We are experiencing heavy load. Please try again shortly.")
+            response = render(request, "login.html", status=503)
+            response["Retry-After"] = "5"
+            return response
+
+        if user is None:
             messages.error(request, "Invalid email or password.")
             return render(request, "login.html")
 
+        # only reveal the account state once the password has matched
         if not user.is_active:
             messages.error(request, "Account not activated. Check your email.")
             return render(request, "login.html")
 
-        if not user.check_password(password):
-            messages.error(request, "Invalid email or password.")
-            return render(request, "login.html")
-
-    
         backend = settings.AUTHENTICATION_BACKENDS[0]
         user.backend = backend
         login(request, user)
@@ -89,57 +124,227 @@ def logout_view(request):
     return redirect("project_list")
 
 
+MY_PROJECTS_PER_PAGE = 25
+
+
 @login_required(login_url='login')
 def my_projects(request):
-    projects = Project.objects.filter(creator=request.user)
-    return render(request, "projects/my_projects.html", {"projects": projects})
+    # One query for the page and one for the totals, however many projects
+    # the owner has: raised and donations are the running totals, the newest
+    # donation is a per-row seek on donation_project_created_idx.
+    owned = Project.objects.filter(owner=request.user)
+    newest = Donation.objects.filter(project=OuterRef("pk")).order_by("-created_at", "-id")
+    paginator = CursorPaginator(
+        owned.defer("details").annotate(last_donation_at=Subquery(newest.values("created_at")[:1])),
+        MY_PROJECTS_PER_PAGE,
+    )
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        raise Http404("Invalid cursor.")
+    summary = owned.aggregate(projects=Count("pk"), raised=Sum("raised_amount"), donations=Sum("donation_count"))
+    return render(request, "projects/my_projects.html", {
+        "projects": page.object_list,
+        "page_obj": page,
+        "summary": summary,
+    })
+
+
+DONATIONS_PER_PAGE = 50
+
+
+# ?order= values for the project list. The leaderboards sort on the running
+# totals kept on Project; trending joins the table refresh_trending rewrites.
+PROJECT_ORDERINGS = {
+    "newest": ("-created_at", "-id"),
+    "funded": ("-raised_amount", "-id"),
+    "donations": ("-donation_count", "-id"),
+    "donors": ("-donation_count", "-id"),  # the old name, for bookmarked links
+    "trending": ("-trend__amount_24h", "-id"),
+    "trending_week": ("-trend__amount_7d", "-id"),
+}
+TRENDING_FILTERS = {
+    "trending": {"trend__amount_24h__gt": 0},
+    "trending_week": {"trend__amount_7d__gt": 0},
+}
+
+
+def use_cursor_pagination(params):
+    if params.get("q", "").strip():
+        # ranked search results page by offset, not by (created_at, id)
+        return False
+    if params.get("order", "newest") != "newest":
+        return False
+    return settings.CROWDFUND_CURSOR_PAGINATION or "cursor" in params
+
+
+def filter_projects(qs, params):
+    qs = qs.filter(is_active=True).order_by("-created_at", "-id")
+    q = params.get("q", "").strip()
+    date_str = params.get("date", "").strip()
+
+    if date_str:
+        try:
+            # expects YYYY-MM-DD
+            d = datetime.date.fromisoformat(date_str)
+            qs = qs.filter(start_date__lte=d, end_date__gte=d)
+        except ValueError:
+            # invalid date — return empty queryset or ignore filter
+            qs = qs.none()
+
+    order = params.get("order", "")
+    if order in TRENDING_FILTERS:
+        qs = qs.filter(**TRENDING_FILTERS[order])
+
+    if q:
+        qs = get_search_backend(qs.db).search(qs, q)
+
+    # an explicit order wins over search relevance
+    if order in PROJECT_ORDERINGS:
+        qs = qs.order_by(*PROJECT_ORDERINGS[order])
+
+    return qs
 
 
+@method_decorator(conditional_page(project_list_validators), name="dispatch")
 class ProjectListView(ListView):
     model = Project
     template_name = "projects/project_list.html"
     context_object_name = "projects"
     paginate_by = 10
 
-    def get_queryset(self):
-        qs = super().get_queryset().filter(is_active=True).order_by("-created_at")
-        q = self.request.GET.get("q", "").strip()
-        date_str = self.request.GET.get("date", "").strip()
-
-        if q:
-            qs = qs.filter(title__icontains=q)
+    def use_cursor_pagination(self):
+        return use_cursor_pagination(self.request.GET)
 
-        if date_str:
-            try:
-                # expects YYYY-MM-DD
-                d = datetime.date.fromisoformat(date_str)
-                qs = qs.filter(start_date__lte=d, end_date__gte=d)
-            except ValueError:
-                # invalid date — return empty queryset or ignore filter
-                qs = qs.none()
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid cursor.")
+        return paginator, page, page.object_list, page.has_other_pages()
 
-        return qs
+    def get_queryset(self):
+        return filter_projects(super().get_queryset(), self.request.GET)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx["q"] = self.request.GET.get("q", "")
         ctx["date"] = self.request.GET.get("date", "")
+        ctx["order"] = self.request.GET.get("order", "")
+        ctx["cursor_mode"] = self.use_cursor_pagination()
         return ctx
 
 
+def project_detail_context(project, donation_form):
+    # `donations` stays a lazy queryset: it is only evaluated when the cached
+    # donations fragment has to be re-rendered.
+    return {
+        "project": project,
+        "donation_form": donation_form,
+        "donations": project.donations.select_related("donor")[:10],
+        "total_donated": project.total_donated(),
+        "fragment_ttl": settings.CROWDFUND_FRAGMENT_TTL,
+    }
+
+
+@method_decorator(conditional_page(project_detail_validators), name="dispatch")
 class ProjectDetailView(DetailView):
     model = Project
     template_name = "projects/project_detail.html"
     context_object_name = "project"
 
+    def get_object(self, queryset=None):
+        # already loaded by project_detail_validators unless this is a HEAD/GET miss
+        project = getattr(self.request, "validated_project", None)
+        return project if project is not None else super().get_object(queryset)
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["donation_form"] = DonationForm()
-        ctx["donations"] = self.object.donations.all()[:10]
-        ctx["total_donated"] = self.object.total_donated()
+        ctx.update(project_detail_context(self.object, DonationForm()))
         return ctx
 
 
+def project_donations(request, pk):
+    project = get_object_or_404(Project, pk=pk)
+    paginator = CursorPaginator(project.donations.select_related("donor"), DONATIONS_PER_PAGE)
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        raise Http404("Invalid cursor.")
+    return render(request, "projects/donation_list.html", {
+        "project": project,
+        "donations": page.object_list,
+        "page_obj": page,
+    })
+
+
+@login_required(login_url='login')
+def export_project_donations(request, pk):
+    project = get_object_or_404(Project, pk=pk)
+    if not (request.user == project.owner or request.user.is_staff):
+        raise PermissionDenied
+    fmt = request.GET.get("format", "csv")
+    if fmt not in WRITERS:
+        return HttpResponseBadRequest("Unknown export format.")
+    try:
+        since = datetime.date.fromisoformat(request.GET["since"]) if request.GET.get("since") else None
+        until = datetime.date.fromisoformat(request.GET["until"]) if request.GET.get("until") else None
+    except ValueError:
+        return HttpResponseBadRequest("Dates must be YYYY-MM-DD.")
+
+    response = StreamingHttpResponse(
+        export_donations(project.donations.all(), fmt, since, until), content_type=WRITERS[fmt][1]
+    )
+    response["Content-Disposition"] = f'attachment; filename="project-{project.pk}-donations.{fmt}"'
+    return response
+
+
+ANALYTICS_DEFAULT_DAYS = 30
+ANALYTICS_MAX_DAYS = 731
+
+
+@login_required(login_url='login')
+def project_analytics(request, pk):
+    project = get_object_or_404(Project, pk=pk)
+    if not (request.user == project.owner or request.user.is_staff):
+        raise PermissionDenied
+    try:
+        until = datetime.date.fromisoformat(request.GET["until"]) if request.GET.get("until") else timezone.localdate()
+        since = (datetime.date.fromisoformat(request.GET["since"]) if request.GET.get("since")
+                 else until - datetime.timedelta(days=ANALYTICS_DEFAULT_DAYS - 1))
+    except ValueError:
+        return HttpResponseBadRequest("Dates must be YYYY-MM-DD.")
+    if since > until or (until - since).days >= ANALYTICS_MAX_DAYS:
+        return HttpResponseBadRequest(f"Pick a range of 1 to {ANALYTICS_MAX_DAYS} days.")
+
+    series = daily_series(project, since, until)
+    totals = {
+        "amount_sum": sum(day["amount_sum"] for day in series),
+        "count": sum(day["count"] for day in series),
+    }
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "project": project.pk,
+            "since": since, "until": until,
+            "totals": totals,
+            "days": series,
+        })
+    peak = max((day["amount_sum"] for day in series), default=0)
+    for day in series:
+        day["percent_of_peak"] = day["amount_sum"] * 100 // peak if peak else 0
+    return render(request, "projects/project_analytics.html", {
+        "project": project,
+        "since": since,
+        "until": until,
+        "series": series,
+        "totals": totals,
+        "watermark": RollupWatermark.objects.filter(name=ROLLUP_WATERMARK).first(),
+    })
+
+
 class ProjectCreateView(LoginRequiredMixin, CreateView):
     model = Project
     form_class = ProjectForm
@@ -178,6 +383,17 @@ class ProjectDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return self.request.user == project.creator
 
 
+@retry_on_busy
+def save_donation(project, donation, request=None):
+    # a retry starts from a clean, unsaved instance
+    donation.pk = None
+    donation._state.adding = True
+    with transaction.atomic():
+        donation.save()
+        project.add_donation_totals(donation.amount)
+        queue_receipts([donation], request)
+
+
 def donate_project(request, pk):
     project = get_object_or_404(Project, pk=pk, is_active=True)
 
@@ -196,15 +412,21 @@ def donate_project(request, pk):
                     donation.donor_email = request.user.email
                 if not donation.donor_name:
                     donation.donor_name = f"{request.user.first_name} {request.user.last_name}".strip()
-            donation.save()
+            if settings.CROWDFUND_DONATION_WRITE_BEHIND:
+                DonationJournal().append(donation)
+                messages.success(request, f"Thank you for donating {donation.amount} EGP! "
+                                          "It will appear on the project shortly.")
+                return redirect("project_detail", pk=project.pk)
+            save_donation(project, donation, request)
             messages.success(request, f"Thank you for donating {donation.amount} EGP!")
             return redirect("project_detail", pk=project.pk)
         else:
             messages.error(request, "Please correct the donation form errors.")
-            return render(request, "projects/project_detail.html", {
-                "project": project,
-                "donation_form": form,
-                "donations": project.donations.all()[:10],
-                "total_donated": project.total_donated(),
-            })
-    return redirect("project_detail", pk=project.pk)
\ No newline at end of file
+            return render(request, "projects/project_detail.html", project_detail_context(project, form))
+    return redirect("project_detail", pk=project.pk)
+
+
+def metrics(request):
+    if request.META.get("REMOTE_ADDR") not in settings.CROWDFUND_METRICS_IPS:
+        raise Http404
+    return HttpResponse(prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")